@@ -1,8 +1,26 @@
 """Challenge Portal Annotator - Browse and annotate Synapse challenge projects."""
 
+import os
+import time
+
+RUN_STARTED = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
 from src import auth, synapse_service as service
+from src.lazy import lazy_import
+from src.metrics import metrics, start_exporter
+from src.scheduler import Throttled
+
+# Only needed once there are tables to show
+pd = lazy_import("pandas")
+
+
+def record_startup(phase):
+    """Record how long this run of the script took to reach `phase`."""
+    metrics.observe(f"startup.{phase}", time.perf_counter() - RUN_STARTED)
+
+
+record_startup("imports")
 
 # ------------------------------------------------------------------
 # 1. Config
@@ -34,171 +52,623 @@ st.markdown(
 # 3. Authentication
 # ------------------------------------------------------------------
 syn = auth.require_auth()
+record_startup("auth")
 
 # Initialize Session State
 if "selected_project_id" not in st.session_state:
     st.session_state.selected_project_id = None
 if "selected_project_name" not in st.session_state:
     st.session_state.selected_project_name = None
+if "table_nonce" not in st.session_state:
+    st.session_state.table_nonce = 0
 
+PAGE_SIZES = [25, 50, 100, 250]  # Rows per page of the project table
+WIKI_TREE_MAX_ROWS = 100  # Wiki pages listed in the sidebar at once
+# How projects whose status lookup failed are labelled, by the kind of failure
+ERROR_LABELS = {"no_access": "🚫 No access", "throttled": "⏳ Throttled"}
 
-# ------------------------------------------------------------------
-# Helper: Cached function to fetch project data with annotations
-# ------------------------------------------------------------------
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def fetch_projects_with_annotations(_syn):
-    """Fetch all projects with their annotations status and permissions."""
-    projects_df = service.fetch_project_list(_syn)
+# Show the diagnostics panel with ?diagnostics=1 or for the whole deployment
+SHOW_DIAGNOSTICS = bool(os.environ.get("CHALLENGE_DASHBOARD_DIAGNOSTICS"))
 
-    if projects_df.empty:
-        return []
+# Export metrics to CHALLENGE_DASHBOARD_METRICS_FILE, if set
+start_exporter()
 
-    table_data = []
-    for _, row in projects_df.iterrows():
-        project_id = row["id"]
-        project_name = row["name"]
 
-        # Check if any annotations exist (excluding system annotations)
-        has_annotations = False
-        try:
-            annos = _syn.get_annotations(project_id)
-            # Check if there are any non-empty annotations
-            if annos:
-                has_annotations = any(annos.get(key) for key in annos.keys())
-        except:
-            has_annotations = False
-
-        # Check edit permissions
-        can_edit = service.can_edit_entity(_syn, project_id)
-
-        table_data.append(
-            {
-                "Project Name": project_name,
-                "Project ID": project_id,
-                "Has Annotations": has_annotations,
-                "Can Edit": can_edit,
-            }
+# ------------------------------------------------------------------
+# Helper: Diagnostics
+# ------------------------------------------------------------------
+def show_diagnostics():
+    """Show call counts, latencies and cache hit ratios recorded by this server."""
+    summary = metrics.snapshot()
+    with st.sidebar.expander("📈 Diagnostics"):
+        st.caption(
+            f"Across all sessions since {format_age(time.time() - summary['started_at'])}"
         )
-
-    return table_data
+        operations = {
+            name: op
+            for name, op in summary["operations"].items()
+            if not name.startswith("startup.")
+        }
+        if operations:
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "Operation": name,
+                            "Calls": op["calls"],
+                            "Errors": op["errors"],
+                            "p50 (ms)": round(op["p50"] * 1000, 1),
+                            "p95 (ms)": round(op["p95"] * 1000, 1),
+                            "Max (ms)": round(op["max"] * 1000, 1),
+                        }
+                        for name, op in operations.items()
+                    ]
+                ).sort_values("p95 (ms)", ascending=False),
+                use_container_width=True,
+                hide_index=True,
+            )
+        startup = {
+            name.removeprefix("startup."): op
+            for name, op in summary["operations"].items()
+            if name.startswith("startup.")
+        }
+        if startup:
+            # Time from the start of a run until each phase was reached; the
+            # first run after the server started also imports and logs in
+            st.caption("Startup")
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "Phase": name,
+                            "Runs": op["calls"],
+                            "Cold (ms)": round(op["first"] * 1000, 1),
+                            "p50 (ms)": round(op["p50"] * 1000, 1),
+                            "p95 (ms)": round(op["p95"] * 1000, 1),
+                            "Max (ms)": round(op["max"] * 1000, 1),
+                        }
+                        for name, op in startup.items()
+                    ]
+                ),
+                use_container_width=True,
+                hide_index=True,
+            )
+        if summary["caches"]:
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "Cache": name,
+                            "Hits": counts["hits"],
+                            "Misses": counts["misses"],
+                            "Hit Ratio": (
+                                f"{counts['hit_ratio']:.0%}"
+                                if counts["hit_ratio"] is not None
+                                else "-"
+                            ),
+                        }
+                        for name, counts in summary["caches"].items()
+                    ]
+                ),
+                use_container_width=True,
+                hide_index=True,
+            )
+        st.download_button(
+            "⬇️ Prometheus metrics",
+            data=metrics.to_prometheus(),
+            file_name="metrics.prom",
+            mime="text/plain",
+        )
+        if st.button("Reset metrics"):
+            metrics.reset()
+            st.rerun()
 
 
 # ------------------------------------------------------------------
-# 4. Project Table View (if not selected)
+# Helper: Project snapshot, served stale while it refreshes
 # ------------------------------------------------------------------
-if st.session_state.selected_project_id is None:
-    st.title("🏆 Challenge Projects")
-    st.markdown("View and annotate challenge projects for the Challenge Portal")
-    st.caption(":orange[🔗 Link to portal: https://challenges.synapse.org/]")
+project_store = service.get_project_store(syn)
 
-    # Add refresh button to clear cache
-    col1, col2 = st.columns([6, 1])
-    with col2:
-        if st.button("🔄 Refresh", help="Reload project data"):
-            fetch_projects_with_annotations.clear()
+
+def format_age(seconds):
+    """Describe how long ago something happened."""
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min ago"
+    return f"{int(seconds // 3600)} h ago"
+
+
+def format_size(num_bytes):
+    """Describe a size in bytes in the largest fitting unit."""
+    for unit in ["B", "KB", "MB", "GB", "TB"]:
+        if num_bytes < 1024 or unit == "TB":
+            break
+        num_bytes /= 1024
+    return f"{num_bytes:,.0f} {unit}" if unit == "B" else f"{num_bytes:,.1f} {unit}"
+
+
+def show_throttled(what, key):
+    """Say that Synapse throttled the request for `what`, with a button to try again."""
+    st.warning(f"⏳ Synapse is limiting requests right now, so {what}.")
+    if st.button("🔄 Try again", key=key):
+        st.rerun()
+
+
+def show_snapshot_status():
+    """Show how old the project data is, and rerun once a refresh lands."""
+    shown_at = project_store.updated_at
+
+    # Only poll while a refresh is running
+    @st.fragment(run_every=2 if project_store.refreshing else None)
+    def snapshot_status():
+        if project_store.updated_at != shown_at:
             st.rerun()
+        if project_store.updated_at is not None:
+            status = f"🕒 Data as of {format_age(project_store.age)}"
+            if project_store.refreshing:
+                status += " · refreshing in the background..."
+            st.caption(status)
+        if project_store.error:
+            st.caption(f":orange[⚠️ {project_store.error}]")
+
+    snapshot_status()
+
+
+def annotation_value_input(anno_key, default_value="", key=None):
+    """Render the value widget suited to an annotation key and return its value."""
+    widget_key = None if key is None else f"{key}_{anno_key}"
+    if anno_key and anno_key.lower() == "status":
+        return st.selectbox(
+            "New Status", options=["Active", "Upcoming", "Closed"], key=widget_key
+        )
+    if anno_key and anno_key.lower() == "challengetype":
+        challenge_types = st.multiselect(
+            "Challenge Type(s)",
+            options=["Data To Model", "Model to Data", "Project/Writeup"],
+            help="Select one or more challenge types",
+            key=widget_key,
+        )
+        # Stored as a multi-value annotation, as the Project View holds it
+        return challenge_types
+    return st.text_input("New Value", value=default_value, key=widget_key)
+
+
+def project_table_frame(projects):
+    """Build the landing page table for a page of the project snapshot."""
+    failed = projects["Error"].notna()
+    error_labels = projects["Error Kind"].astype("object").map(ERROR_LABELS)
+    annotations = (
+        projects["Has Annotations"]
+        .map({True: "✅ Has annotations", False: "❌ No annotations"})
+        .mask(failed, error_labels.fillna("⚠️ Could not check"))
+    )
+    access = (
+        projects["Can Edit"]
+        .map({True: "✏️ Can edit", False: "🔒 Read only"})
+        .mask(failed & error_labels.notna(), error_labels)
+    )
+    frame = pd.DataFrame(
+        {
+            "Project Name": projects["Project Name"],
+            "Project ID": projects["Project ID"],
+            "Annotations": annotations,
+            "Access": access,
+        }
+    )
+    if failed.any():
+        frame["Error"] = projects["Error"].fillna("")
+    return frame.reset_index(drop=True)
 
-    st.markdown("---")
 
-    with st.spinner("Loading challenge projects..."):
-        all_projects = fetch_projects_with_annotations(syn)
+def show_bulk_edit(projects):
+    """
+    Apply one annotation change to the editable projects selected in the table.
+
+    `projects` holds the selected rows of every page, not just the one shown.
+    """
+    editable_projects = service.editable_projects(projects)
 
-    if all_projects:
-        # Search and sorting controls
-        col1, col2 = st.columns([3, 1])
+    with st.container(border=True):
+        st.markdown("#### ✏️ Bulk Edit Annotations")
+        if editable_projects.empty:
+            st.info(
+                "Select editable projects in the table above to edit them together. "
+                "Selections are kept while you page, search and sort."
+            )
+            return
+        col1, col2 = st.columns([4, 1])
         with col1:
-            search = st.text_input(
-                "🔍 Search challenge projects", placeholder="Type to filter..."
+            st.caption(
+                f"{len(editable_projects)} selected: "
+                + ", ".join(editable_projects["Project Name"].head(10))
+                + (
+                    f" and {len(editable_projects) - 10} more"
+                    if len(editable_projects) > 10
+                    else ""
+                )
             )
         with col2:
-            sort_by = st.selectbox(
-                "Sort by",
-                options=[
-                    "Editable First",
-                    "Name (A-Z)",
-                    "Name (Z-A)",
-                    "Has Annotations",
-                ],
-                index=0,
-            )
+            if st.button("Clear selection", key="bulk_clear"):
+                st.session_state.bulk_selection = set()
+                # The tables keep their checkboxes, so start new ones
+                st.session_state.table_nonce += 1
+                st.rerun()
 
-        # Filter projects based on search
-        if search:
-            table_data = [
-                p
-                for p in all_projects
-                if search.lower() in p["Project Name"].lower()
-                or search.lower() in p["Project ID"].lower()
-            ]
+        try:
+            schema_columns = service.fetch_view_schema(syn)
+        except Throttled:
+            show_throttled("the annotation keys could not be loaded", "bulk_retry")
+            return
+        if schema_columns:
+            bulk_key = st.selectbox(
+                "Annotation Key", options=schema_columns, key="bulk_key"
+            )
         else:
-            table_data = all_projects
+            bulk_key = st.text_input("Annotation Key", key="bulk_key_text")
+        bulk_value = annotation_value_input(bulk_key, key="bulk_value")
+
+        if st.button(
+            f"💾 Apply to {len(editable_projects)} project(s)", disabled=not bulk_key
+        ):
+            progress = st.progress(0.0, text="Saving annotations...")
+
+            def on_progress(done, total, result):
+                progress.progress(done / total, text=f"Saved {done} of {total}")
+
+            results = service.bulk_update_annotations(
+                syn,
+                editable_projects["Project ID"].tolist(),
+                {bulk_key: bulk_value},
+                on_progress=on_progress,
+            )
 
-        # Sort projects based on selection
-        if sort_by == "Editable First":
-            # Editable projects first, then by name
-            table_data = sorted(
-                table_data, key=lambda x: (not x["Can Edit"], x["Project Name"].lower())
+            succeeded = sum(result["success"] for result in results)
+            summary = (
+                f"Updated **{bulk_key}** on {succeeded} of {len(results)} project(s)."
             )
-        elif sort_by == "Name (A-Z)":
-            table_data = sorted(table_data, key=lambda x: x["Project Name"].lower())
-        elif sort_by == "Name (Z-A)":
-            table_data = sorted(
-                table_data, key=lambda x: x["Project Name"].lower(), reverse=True
+            if succeeded == len(results):
+                st.success(summary)
+            else:
+                st.warning(summary)
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "Project ID": result["id"],
+                            "Result": "✅" if result["success"] else "❌",
+                            "Error": result["error"] or "",
+                        }
+                        for result in results
+                    ]
+                ),
+                use_container_width=True,
+                hide_index=True,
             )
-        elif sort_by == "Has Annotations":
-            # Projects with annotations first, then by name
-            table_data = sorted(
-                table_data,
-                key=lambda x: (not x["Has Annotations"], x["Project Name"].lower()),
+
+            # Pick up the new annotation status on the landing page
+            project_store.refresh(syn)
+
+
+def show_annotation_coverage():
+    """Show how well each annotation key is filled in, and which projects lack it."""
+    try:
+        coverage = service.get_annotation_coverage(syn)
+    except Throttled:
+        show_throttled("the annotation keys could not be loaded", "coverage_retry")
+        return
+    summary = coverage["summary"]
+    if summary.empty:
+        st.info("The Project View has no annotation columns.")
+        return
+
+    st.dataframe(
+        summary.assign(**{"Fill Rate": summary["Fill Rate"] * 100}),
+        column_config={
+            "Fill Rate": st.column_config.ProgressColumn(
+                "Fill Rate", format="%.0f%%", min_value=0, max_value=100
             )
+        },
+        use_container_width=True,
+        hide_index=True,
+    )
 
-        if not table_data:
-            st.warning("No challenge projects match your search.")
+    key = st.selectbox("Annotation Key", options=summary["Key"], key="coverage_key")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown(f"**Values of {key}**")
+        counts = coverage["values"][key]
+        if counts.empty:
+            st.caption("No project has a value yet.")
         else:
-            st.markdown(f"*Showing {len(table_data)} project(s)*")
+            st.bar_chart(counts)
+    with col2:
+        missing = service.sort_projects(coverage["missing"][key], "Editable First")
+        st.markdown(f"**{len(missing)} project(s) missing {key}**")
+        if missing.empty:
+            return
+        st.caption("Select a project to fill it in.")
+        event = st.dataframe(
+            project_table_frame(missing)[["Project Name", "Project ID", "Access"]],
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key=f"coverage_missing_{key}_{st.session_state.table_nonce}",
+        )
+        if event.selection.rows:
+            item = missing.iloc[event.selection.rows[0]]
+            if item["Can Edit"]:
+                st.session_state.selected_project_id = item["Project ID"]
+                st.session_state.selected_project_name = item["Project Name"]
+                # Open the annotation form on the missing key
+                st.session_state.annotation_focus_key = key
+                st.session_state.table_nonce += 1
+                st.rerun()
+            else:
+                st.warning(
+                    f"🔒 You do not have permission to edit **{item['Project Name']}**."
+                )
 
-            # Create table display
-            for item in table_data:
-                col1, col2, col3, col4 = st.columns([3, 2, 1.5, 1])
 
-                with col1:
-                    st.markdown(f"**{item['Project Name']}**")
+def show_wiki_tree(tree):
+    """
+    Render a wiki as a collapsible tree in the sidebar and return the selected page ID.
 
-                with col2:
-                    st.caption(item["Project ID"])
+    Only the children of expanded pages are rendered. Clicking a page selects
+    it and expands or collapses it.
+    """
+    state = st.session_state
+    if state.get("wiki_selected") not in tree:
+        state.wiki_selected = tree.roots[0]
+        state.wiki_expanded = set(tree.roots)
+    expanded = state.wiki_expanded
+
+    filter_text = st.text_input(
+        "Filter pages", placeholder="Page title...", key="wiki_filter"
+    )
+    if filter_text:
+        rows = [(wiki_id, 0) for wiki_id in tree.filter(filter_text)]
+        if not rows:
+            st.caption("No pages match your filter.")
+    else:
+        rows = tree.visible(expanded)
+
+    for wiki_id, depth in rows[:WIKI_TREE_MAX_ROWS]:
+        if filter_text:
+            # Show where each match sits, since the tree is flattened
+            label = " › ".join(tree.titles[i] for i in tree.path(wiki_id))
+        elif tree.children[wiki_id]:
+            marker = "▾" if wiki_id in expanded else "▸"
+            label = "\u2003" * depth + f"{marker} {tree.titles[wiki_id]}"
+        else:
+            label = "\u2003" * depth + f"• {tree.titles[wiki_id]}"
+
+        if st.button(
+            label,
+            key=f"wiki_page_{wiki_id}",
+            type="primary" if wiki_id == state.wiki_selected else "secondary",
+            use_container_width=True,
+        ):
+            if wiki_id == state.wiki_selected:
+                expanded ^= {wiki_id}
+            else:
+                expanded.update(tree.path(wiki_id))
+            state.wiki_selected = wiki_id
+            st.rerun()
+
+    if len(rows) > WIKI_TREE_MAX_ROWS:
+        st.caption(
+            f"Showing {WIKI_TREE_MAX_ROWS} of {len(rows)} pages. "
+            "Use the filter to find the others."
+        )
+    return state.wiki_selected
 
+
+def show_folder_browser(folder_id):
+    """
+    Render a folder's contents page by page, with sub-folders expandable in place.
+
+    Only the pages the user has asked for are fetched, and a sub-folder's
+    contents are only fetched once it is expanded.
+    """
+    state = st.session_state
+    folder_pages = state.setdefault("folder_pages", {})
+    expanded = state.setdefault("expanded_folders", set())
+
+    try:
+        children, has_more = service.fetch_folder_contents(
+            syn, folder_id, max_pages=folder_pages.get(folder_id, 1)
+        )
+    except Throttled:
+        show_throttled(
+            "this folder's contents could not be loaded", f"folder_retry_{folder_id}"
+        )
+        return
+    if not children:
+        st.info("This folder is empty.")
+        return
+
+    subfolders = [item for item in children if "Folder" in item.get("type", "")]
+    files = [item for item in children if "Folder" not in item.get("type", "")]
+
+    for subfolder in subfolders:
+        subfolder_id = subfolder["id"]
+        marker = "▾" if subfolder_id in expanded else "▸"
+        if st.button(
+            f"{marker} 📂 {subfolder.get('name', 'Unknown')} ({subfolder_id})",
+            key=f"folder_toggle_{folder_id}_{subfolder_id}",
+        ):
+            expanded ^= {subfolder_id}
+            st.rerun()
+        if subfolder_id in expanded:
+            with st.container(border=True):
+                show_folder_browser(subfolder_id)
+
+    if files:
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {
+                        "": "📄",
+                        "Name": item.get("name", "Unknown"),
+                        "ID": item.get("id", "Unknown"),
+                        "Created": item.get("createdOn", "Unknown"),
+                    }
+                    for item in files
+                ]
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    if has_more and st.button("Load more", key=f"folder_more_{folder_id}"):
+        folder_pages[folder_id] = folder_pages.get(folder_id, 1) + 1
+        st.rerun()
+
+
+if SHOW_DIAGNOSTICS or st.query_params.get("diagnostics"):
+    show_diagnostics()
+
+
+# ------------------------------------------------------------------
+# 4. Project Table View (if not selected)
+# ------------------------------------------------------------------
+if st.session_state.selected_project_id is None:
+    st.title("🏆 Challenge Projects")
+    st.markdown("View and annotate challenge projects for the Challenge Portal")
+    st.caption(":orange[🔗 Link to portal: https://challenges.synapse.org/]")
+    record_startup("first_paint")
+
+    # Refresh buttons: incremental by default, full reload rebuilds from scratch
+    col1, col2, col3 = st.columns([5, 1, 1])
+    with col2:
+        if st.button("🔄 Refresh", help="Reload projects that changed"):
+            project_store.refresh(syn)
+    with col3:
+        if st.button("♻️ Full Reload", help="Reload all project data"):
+            service.clear_project_cache()
+            project_store.refresh(syn, full=True)
+
+    with st.spinner("Loading challenge projects..."):
+        all_projects = project_store.get(syn)
+
+    show_snapshot_status()
+    projects_tab, coverage_tab = st.tabs(["📋 Projects", "📊 Annotation Coverage"])
+
+    with projects_tab:
+        if not all_projects.empty:
+            # Search and sorting controls
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                search = st.text_input(
+                    "🔍 Search challenge projects",
+                    placeholder="Name, ID, status, challenge type...",
+                )
+            with col2:
+                # While searching, results come best match first unless sorted
+                sort_options = service.SORT_OPTIONS
+                if search:
+                    sort_options = [service.BEST_MATCH, *sort_options]
+                sort_by = st.selectbox("Sort by", options=sort_options, index=0)
+
+            table_data = service.sort_projects(
+                service.search_projects(all_projects, project_store.index, search),
+                sort_by,
+            )
+
+            if table_data.empty:
+                st.warning("No challenge projects match your search.")
+            else:
+                # Pagination keeps the table size, and the rerun cost, flat
+                col1, col2, col3 = st.columns([4, 1, 1])
+                with col2:
+                    page_size = st.selectbox(
+                        "Rows per page", options=PAGE_SIZES, key="page_size"
+                    )
+                page_count = max(1, -(-len(table_data) // page_size))
                 with col3:
-                    if item["Has Annotations"]:
-                        st.markdown(
-                            "✅ <span style='color: #28a745;'>Has annotations</span>",
-                            unsafe_allow_html=True,
-                        )
-                    else:
-                        st.markdown(
-                            "❌ <span style='color: #dc3545;'>No annotations</span>",
-                            unsafe_allow_html=True,
-                        )
-
-                with col4:
-                    if item["Can Edit"]:
-                        if st.button(
-                            "Annotate",
-                            key=f"annotate_{item['Project ID']}",
-                            use_container_width=True,
-                        ):
+                    page = st.number_input(
+                        "Page", min_value=1, max_value=page_count, value=1, step=1
+                    )
+                with col1:
+                    bulk_mode = st.toggle(
+                        "✏️ Bulk edit", help="Select several projects to edit together"
+                    )
+                    first = (page - 1) * page_size
+                    page_rows = table_data.iloc[first : first + page_size]
+                    st.markdown(
+                        f"*Showing {first + 1}-{first + len(page_rows)} of "
+                        f"{len(table_data)} project(s)*"
+                    )
+
+                # Selections and edits are kept by row position, and Streamlit
+                # keeps them for a keyed table when its data changes. Keying
+                # the table by the projects it shows starts afresh whenever
+                # paging, searching, sorting or a refresh puts others there.
+                shown = hash(tuple(page_rows.index))
+                nonce = st.session_state.table_nonce
+
+                if bulk_mode:
+                    # The bulk selection is kept by project ID, so that it
+                    # carries across pages, searches and sorts
+                    selection = st.session_state.setdefault("bulk_selection", set())
+                    table = project_table_frame(page_rows)
+                    table.insert(
+                        0,
+                        "Selected",
+                        page_rows["Project ID"].isin(selection).to_numpy(),
+                    )
+                    edited = st.data_editor(
+                        table,
+                        use_container_width=True,
+                        hide_index=True,
+                        disabled=[column for column in table if column != "Selected"],
+                        key=f"bulk_table_{nonce}_{shown}",
+                    )
+                    selection -= set(page_rows["Project ID"])
+                    selection |= set(edited.loc[edited["Selected"], "Project ID"])
+                    show_bulk_edit(
+                        all_projects[all_projects["Project ID"].isin(selection)]
+                    )
+                else:
+                    st.session_state.pop("bulk_selection", None)
+
+                    event = st.dataframe(
+                        project_table_frame(page_rows),
+                        use_container_width=True,
+                        hide_index=True,
+                        on_select="rerun",
+                        selection_mode="single-row",
+                        key=f"project_table_{nonce}_{shown}",
+                    )
+                    selected_rows = page_rows.iloc[
+                        [row for row in event.selection.rows if row < len(page_rows)]
+                    ]
+
+                    if not selected_rows.empty:
+                        item = selected_rows.iloc[0]
+                        if item["Can Edit"]:
                             st.session_state.selected_project_id = item["Project ID"]
                             st.session_state.selected_project_name = item[
                                 "Project Name"
                             ]
+                            st.session_state.annotation_focus_key = None
+                            # Start with a fresh selection when coming back to the list
+                            st.session_state.table_nonce += 1
                             st.rerun()
-                    else:
-                        st.markdown("🔒", help="No edit permission")
+                        else:
+                            st.warning(
+                                f"🔒 You do not have permission to edit **{item['Project Name']}**."
+                            )
+        else:
+            st.warning(
+                "No challenge projects found. Make sure you have access to at least one Synapse challenge project."
+            )
 
-                st.divider()
-    else:
-        st.warning(
-            "No challenge projects found. Make sure you have access to at least one Synapse challenge project."
-        )
+    with coverage_tab:
+        if not all_projects.empty:
+            show_annotation_coverage()
 
     st.stop()
 
@@ -210,6 +680,7 @@ project_name = st.session_state.selected_project_name
 
 st.title(f"📖 {project_name}")
 st.caption(f"Synapse Project ID: {project_id}")
+record_startup("first_paint")
 
 # Check for and display persistent success/error messages (from previous rerun)
 if "annotation_msg" in st.session_state:
@@ -238,6 +709,7 @@ with st.sidebar:
     if st.button("📂 List All Challenge Projects", use_container_width=True):
         st.session_state.selected_project_id = None
         st.session_state.selected_project_name = None
+        st.session_state.annotation_focus_key = None
         st.rerun()
 
     st.markdown("---")
@@ -246,30 +718,27 @@ with st.sidebar:
     with st.expander("🔄 Project Quick Switch", expanded=False):
         with st.spinner("Loading..."):
             # Use cached data to get projects with permissions
-            all_projects = fetch_projects_with_annotations(syn)
+            all_projects = project_store.get(syn)
 
             # Filter to only editable projects
-            editable_projects = [p for p in all_projects if p["Can Edit"]]
+            editable_projects = service.editable_projects(all_projects)
 
-        if editable_projects:
+        if not editable_projects.empty:
             # Filter projects based on search
-            if project_search:
-                filtered_projects = [
-                    p
-                    for p in editable_projects
-                    if project_search.lower() in p["Project Name"].lower()
-                    or project_search.lower() in p["Project ID"].lower()
-                ]
-            else:
-                filtered_projects = editable_projects
+            filtered_projects = service.search_projects(
+                editable_projects, project_store.index, project_search
+            )
 
-            if not filtered_projects:
+            if filtered_projects.empty:
                 st.warning("No projects match your search.")
             else:
-                project_options = {
-                    f"{p['Project Name']} ({p['Project ID']})": p["Project ID"]
-                    for p in filtered_projects
-                }
+                labels = (
+                    filtered_projects["Project Name"]
+                    + " ("
+                    + filtered_projects["Project ID"]
+                    + ")"
+                )
+                project_options = dict(zip(labels, filtered_projects["Project ID"]))
 
                 current_label = next(
                     (k for k, v in project_options.items() if v == project_id), None
@@ -300,7 +769,13 @@ with st.sidebar:
 # ------------------------------------------------------------------
 # 7. Permission Check
 # ------------------------------------------------------------------
-can_edit = service.can_edit_entity(syn, project_id)
+try:
+    can_edit = service.can_edit_entity(syn, project_id)
+except Throttled:
+    show_throttled(
+        "your access to this project could not be checked", "permission_retry"
+    )
+    st.stop()
 
 if not can_edit:
     st.error("🔒 You do not have permission to edit annotations for this project.")
@@ -323,22 +798,36 @@ with st.sidebar:
     selected_item_title = None
 
     if resource_type == "Wiki Pages":
-        wiki_headers = service.fetch_wiki_headers(syn, project_id)
-        if not wiki_headers:
-            st.warning("No Wiki pages found.")
+        try:
+            wiki_tree = service.get_wiki_tree(syn, project_id)
+        except Throttled:
+            show_throttled("the wiki pages could not be loaded", "wiki_retry")
         else:
-            wiki_map = {h["title"]: h["id"] for h in wiki_headers}
-            selected_item_title = st.radio("Select Wiki Page:", options=wiki_map.keys())
-            selected_item_id = wiki_map[selected_item_title]
+            if not wiki_tree:
+                st.warning("No Wiki pages found.")
+            else:
+                # Warm the wiki cache once per opened project
+                if st.session_state.get("prefetched_wiki_project") != project_id:
+                    service.prefetch_wiki_pages(syn, project_id, wiki_tree.headers)
+                    st.session_state.prefetched_wiki_project = project_id
+
+                selected_item_id = show_wiki_tree(wiki_tree)
+                selected_item_title = wiki_tree.titles[selected_item_id]
 
     elif resource_type == "Folders":
-        folders = service.fetch_project_folders(syn, project_id)
+        folder_pages = st.session_state.setdefault("folder_pages", {})
+        folders, more_folders = service.fetch_project_folders(
+            syn, project_id, max_pages=folder_pages.get(project_id, 1)
+        )
         if not folders:
             st.warning("No folders found.")
         else:
             folder_map = {f"{f['name']} ({f['id']})": f["id"] for f in folders}
             selected_item_title = st.radio("Select Folder:", options=folder_map.keys())
             selected_item_id = folder_map[selected_item_title]
+            if more_folders and st.button("Load more folders"):
+                folder_pages[project_id] = folder_pages.get(project_id, 1) + 1
+                st.rerun()
 
     elif resource_type == "Tables":
         tables = service.fetch_project_tables(syn, project_id)
@@ -387,7 +876,13 @@ with left_col:
         )
 
         # --- Check for Folder Wiki (README) ---
-        folder_wiki_headers = service.fetch_wiki_headers(syn, selected_item_id)
+        try:
+            folder_wiki_headers = service.fetch_wiki_headers(syn, selected_item_id)
+        except Throttled:
+            folder_wiki_headers = []
+            show_throttled(
+                "the folder's wiki could not be checked", "folder_wiki_retry"
+            )
         if folder_wiki_headers:
             with st.expander("📖 Folder Wiki", expanded=True):
                 with st.spinner("Loading folder wiki..."):
@@ -395,32 +890,34 @@ with left_col:
                     if folder_wiki:
                         st.markdown(folder_wiki.markdown)
 
+        # --- Subtree summary, walked on request since large trees take a while ---
+        summarized = st.session_state.setdefault("summarized_folders", set())
+        if selected_item_id not in summarized:
+            if st.button(
+                "📊 Summarize folder", help="Count files across all subfolders"
+            ):
+                summarized.add(selected_item_id)
+                st.rerun()
+        else:
+            with st.spinner("Summarizing folder..."):
+                summary = service.fetch_folder_summary(syn, selected_item_id)
+            if summary:
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Files", f"{summary['files']:,}")
+                col2.metric("Total Size", format_size(summary["bytes"]))
+                col3.metric(
+                    "Subfolders",
+                    f"{summary['folders']:,}",
+                    help=f"Nested up to {summary['depth']} level(s) deep",
+                )
+                col4.metric(
+                    "Last Modified", (summary["last_modified"] or "Unknown")[:10]
+                )
+
         st.divider()
         st.markdown("### 📂 Folder Contents")
         with st.spinner("Fetching contents..."):
-            folder_contents = service.fetch_folder_contents(syn, selected_item_id)
-
-        if folder_contents:
-            content_data = []
-            for item in folder_contents:
-                # Check type for icon
-                is_folder = "Folder" in item.get("type", "")
-                icon = "📂" if is_folder else "📄"
-
-                content_data.append(
-                    {
-                        "": icon,
-                        "Name": item.get("name", "Unknown"),
-                        "ID": item.get("id", "Unknown"),
-                        "Created": item.get("createdOn", "Unknown"),
-                    }
-                )
-
-            st.dataframe(
-                pd.DataFrame(content_data), use_container_width=True, hide_index=True
-            )
-        else:
-            st.info("This folder is empty.")
+            show_folder_browser(selected_item_id)
 
         default_anno_key = "DataFolder"
         default_anno_val = selected_item_id
@@ -433,7 +930,37 @@ with left_col:
             f"[View on Synapse Web](https://www.synapse.org/Synapse:{selected_item_id})"
         )
 
-        # Currently just showing basic info, but could be expanded to show columns or query data
+        with st.spinner("Loading table..."):
+            table_preview = service.fetch_table_preview(syn, selected_item_id)
+        if table_preview:
+            st.metric("Rows", f"{table_preview['row_count']:,}")
+            with st.expander(
+                f"🧱 Schema ({len(table_preview['columns'])} columns)", expanded=False
+            ):
+                st.dataframe(
+                    pd.DataFrame(table_preview["columns"]),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+
+            # Rows are fetched a page at a time; "Load more" adds the next page
+            table_pages = st.session_state.setdefault("table_pages", {})
+            pages = table_pages.get(selected_item_id, 1)
+            with st.spinner("Loading rows..."):
+                rows = service.fetch_table_rows(
+                    syn, selected_item_id, table_preview["etag"], max_pages=pages
+                )
+            st.markdown("### 🔎 Sample Rows")
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+            st.caption(f"Showing {len(rows):,} of {table_preview['row_count']:,} rows")
+            if (
+                len(rows) < table_preview["row_count"]
+                and len(rows) == pages * service.TABLE_PAGE_SIZE
+            ):
+                if st.button("Load more rows"):
+                    table_pages[selected_item_id] = pages + 1
+                    st.rerun()
+
         st.info("Select this table to annotate it as a challenge resource.")
 
         default_anno_key = "ChallengeTable"
@@ -447,9 +974,13 @@ with right_col:
 
     with st.container(border=True):
         # Fetch Schema Columns
-        schema_columns = list(
-            service.fetch_view_schema(syn)
-        )  # Make a copy to modify safely
+        try:
+            schema_columns = list(
+                service.fetch_view_schema(syn)
+            )  # Make a copy to modify safely
+        except Throttled:
+            show_throttled("the annotation keys could not be loaded", "form_retry")
+            st.stop()
 
         # Prioritize 'status' in the list
         if "status" in schema_columns:
@@ -459,7 +990,10 @@ with right_col:
         # --- SELECT KEY ---
         if schema_columns:
             default_idx = 0
-            if default_anno_key in schema_columns:
+            focus_key = st.session_state.get("annotation_focus_key")
+            if focus_key in schema_columns:
+                default_idx = schema_columns.index(focus_key)
+            elif default_anno_key in schema_columns:
                 default_idx = schema_columns.index(default_anno_key)
             elif (
                 resource_type == "Wiki Pages" and "documentationLink" in schema_columns
@@ -477,7 +1011,7 @@ with right_col:
 
         def update_current_value_display():
             try:
-                current_annos = syn.get_annotations(project_id)
+                current_annos = service.get_annotations(syn, project_id)
                 current_val_raw = current_annos.get(anno_key)
 
                 if current_val_raw:
@@ -513,20 +1047,7 @@ with right_col:
         # --- INPUT VALUE ---
         with st.form("annotation_form"):
 
-            if anno_key and anno_key.lower() == "status":
-                anno_value = st.selectbox(
-                    "New Status", options=["Active", "Upcoming", "Closed"]
-                )
-            elif anno_key and anno_key.lower() == "challengetype":
-                challenge_types = st.multiselect(
-                    "Challenge Type(s)",
-                    options=["Data To Model", "Model to Data", "Project/Writeup"],
-                    help="Select one or more challenge types",
-                )
-                # Convert list to comma-separated string for annotation
-                anno_value = ", ".join(challenge_types) if challenge_types else ""
-            else:
-                anno_value = st.text_input("New Value", value=default_anno_val)
+            anno_value = annotation_value_input(anno_key, default_anno_val)
 
             st.markdown("<br>", unsafe_allow_html=True)
             submitted = st.form_submit_button(
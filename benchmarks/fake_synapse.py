@@ -0,0 +1,332 @@
+"""An offline stand-in for `synapseclient.Synapse`, for benchmarks and load tests."""
+
+import json
+import random
+import re
+import threading
+import time
+
+import pandas as pd
+import requests
+from synapseclient import Column
+from synapseclient.core.exceptions import SynapseHTTPError
+from synapseclient.core.models.dict_object import DictObject
+
+from src.synapse_service import TABLE_ID
+
+VIEW_COLUMNS = ["status", "challengeType", "documentationLink", "DataFolder"]
+STATUSES = ["Active", "Upcoming", "Closed"]
+CHALLENGE_TYPES = ["Data To Model", "Model to Data", "Project/Writeup"]
+WORDS = [
+    "DREAM", "Cancer", "Imaging", "Genomics", "Single-Cell", "Proteomics",
+    "Benchmark", "Prediction", "Survival", "Drug", "Response", "Brain",
+    "Tumor", "Segmentation", "Variant", "Calling", "Microbiome", "Sepsis",
+]  # fmt: skip
+PAGE_SIZE = 50  # Children returned per /entity/children page
+
+
+class _QueryResult:
+    """The parts of a table query result the app reads."""
+
+    def __init__(self, frame, rowset=None):
+        self._frame = frame
+        self.rowset = rowset
+
+    def asDataFrame(self, **kwargs):
+        return self._frame
+
+
+class FakeSynapse:
+    """
+    A synthetic Synapse deployment held in memory.
+
+    It holds `num_projects` challenge projects in the Project View. Some carry
+    annotations, and the logged-in user can edit a share of them. Each project
+    has a wiki tree, a folder tree and one table. Every call sleeps for `latency`
+    seconds, plus up to `jitter` more. A share of calls, set by `error_rate`,
+    fails with an HTTP 503 the way an overloaded Synapse would. The data is
+    generated from `seed`, so runs are repeatable.
+
+    Only the client methods the app uses are implemented.
+    """
+
+    def __init__(
+        self,
+        num_projects=100,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        seed=0,
+        annotated_share=0.6,
+        editable_share=0.3,
+        wiki_pages=12,
+        folder_fanout=4,
+        folder_depth=3,
+        files_per_folder=60,
+        table_rows=2000,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.folder_fanout = folder_fanout
+        self.folder_depth = folder_depth
+        self.files_per_folder = files_per_folder
+        self.table_rows = table_rows
+        self.credentials = DictObject(owner_id="3300000", username="benchmark")
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._etag_counter = 0
+
+        rng = random.Random(seed)
+        self.projects = {}
+        for i in range(num_projects):
+            project_id = f"syn{1000000 + i}"
+            annotations = {}
+            if rng.random() < annotated_share:
+                annotations["status"] = {
+                    "type": "STRING",
+                    "value": [rng.choice(STATUSES)],
+                }
+                annotations["challengeType"] = {
+                    "type": "STRING",
+                    "value": rng.sample(CHALLENGE_TYPES, rng.randint(1, 2)),
+                }
+            self.projects[project_id] = {
+                "name": " ".join(rng.sample(WORDS, 3)) + f" Challenge {i}",
+                "etag": self._new_etag(),
+                "annotations": annotations,
+                "can_edit": rng.random() < editable_share,
+            }
+        self.wiki_headers = [{"id": "1000", "title": "Home", "parentId": None}]
+        for i in range(1, wiki_pages):
+            parent = self.wiki_headers[rng.randrange(len(self.wiki_headers))]
+            self.wiki_headers.append(
+                {"id": str(1000 + i), "title": f"Page {i}", "parentId": parent["id"]}
+            )
+
+    # --- Plumbing ---------------------------------------------------------
+
+    def _new_etag(self):
+        self._etag_counter += 1
+        return f"etag-{self._etag_counter}"
+
+    def _call(self):
+        """Simulate the network: wait, then maybe fail."""
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise _http_error(503, "Service Unavailable (injected)")
+
+    def touch(self, project_id):
+        """Change a project's etag, as an edit made outside the app would."""
+        with self._lock:
+            self.projects[project_id]["etag"] = self._new_etag()
+
+    # --- Client API ---------------------------------------------------------
+
+    def login(self, authToken=None, **kwargs):
+        self._call()
+
+    def getUserProfile(self, *args, **kwargs):
+        self._call()
+        return DictObject(ownerId=self.credentials.owner_id, userName="benchmark")
+
+    def getTableColumns(self, table_id):
+        self._call()
+        names = ["id", "name", "etag", "createdBy", "modifiedBy"]
+        if table_id == TABLE_ID:
+            names += VIEW_COLUMNS
+        else:
+            names += ["participant", "score", "submittedOn"]
+        return [Column(name=name, columnType="STRING") for name in names]
+
+    def tableQuery(self, query, resultsAs="csv", **kwargs):
+        self._call()
+        match = re.match(r"SELECT (.*) FROM (syn[\w.]+)(.*)", query, re.S)
+        columns, table_id, rest = match.groups()
+        if table_id == TABLE_ID:
+            return _QueryResult(self._view_frame(columns))
+
+        if columns.strip().upper() == "COUNT(*)":
+            rows = [{"values": [str(self.table_rows)]}]
+            return _QueryResult(None, rowset={"rows": rows})
+        limit = re.search(r"LIMIT (\d+)", rest)
+        offset = re.search(r"OFFSET (\d+)", rest)
+        start = int(offset.group(1)) if offset else 0
+        stop = min(self.table_rows, start + int(limit.group(1)) if limit else 10**9)
+        rows = range(start, max(start, stop))
+        frame = pd.DataFrame(
+            {
+                "participant": [f"team-{i % 97}" for i in rows],
+                "score": [round((i * 37 % 1000) / 1000, 3) for i in rows],
+                "submittedOn": [f"2024-01-{1 + i % 28:02d}" for i in rows],
+            }
+        )
+        return _QueryResult(frame)
+
+    def _view_frame(self, columns):
+        names = [column.strip().strip('"') for column in columns.split(",")]
+        with self._lock:
+            projects = list(self.projects.items())
+        data = {name: [] for name in names}
+        for project_id, project in projects:
+            for name in names:
+                if name == "id":
+                    value = project_id
+                elif name in ("name", "etag"):
+                    value = project[name]
+                elif name == "modifiedOn":
+                    value = 0
+                else:
+                    values = project["annotations"].get(name, {}).get("value")
+                    if not values:
+                        value = None
+                    elif name == "challengeType":
+                        value = json.dumps(values)
+                    else:
+                        value = values[0]
+                data[name].append(value)
+        return pd.DataFrame(data)
+
+    def restGET(self, uri, **kwargs):
+        self._call()
+        parts = uri.strip("/").split("/")
+        entity_id = parts[1]
+        if len(parts) == 2:
+            return {"id": entity_id, "etag": self._entity_etag(entity_id)}
+        if parts[2] == "annotations2":
+            project = self._project(entity_id)
+            with self._lock:
+                return {
+                    "id": entity_id,
+                    "etag": project["etag"],
+                    "annotations": json.loads(json.dumps(project["annotations"])),
+                }
+        if parts[2] == "permissions":
+            can_edit = (
+                self._project(entity_id)["can_edit"]
+                if entity_id in self.projects
+                else False
+            )
+            return {"canView": True, "canEdit": can_edit, "ownerPrincipalId": 1}
+        if parts[2] == "wiki2":
+            wiki_id = parts[3] if len(parts) > 3 else "1000"
+            return {"id": wiki_id, "etag": f"wiki-{entity_id}-{wiki_id}"}
+        raise _http_error(404, f"Not found: {uri}")
+
+    def restPUT(self, uri, body=None, **kwargs):
+        self._call()
+        entity_id = uri.strip("/").split("/")[1]
+        request = json.loads(body)
+        project = self._project(entity_id)
+        with self._lock:
+            if not project["can_edit"]:
+                raise _http_error(403, "You lack UPDATE access")
+            if request.get("etag") != project["etag"]:
+                raise _http_error(412, "Object has been updated since last read")
+            project["annotations"] = request["annotations"]
+            project["etag"] = self._new_etag()
+            return {
+                "id": entity_id,
+                "etag": project["etag"],
+                "annotations": request["annotations"],
+            }
+
+    def restPOST(self, uri, body=None, **kwargs):
+        self._call()
+        if uri != "/entity/children":
+            raise _http_error(404, f"Not found: {uri}")
+        request = json.loads(body)
+        children = self._children(request["parentId"], request["includeTypes"])
+        start = int(request.get("nextPageToken") or 0)
+        response = {"page": children[start : start + PAGE_SIZE]}
+        if start + PAGE_SIZE < len(children):
+            response["nextPageToken"] = str(start + PAGE_SIZE)
+        if request.get("includeSumFileSizes"):
+            response["sumFileSizesBytes"] = sum(
+                child.get("size", 0) for child in children
+            )
+        return response
+
+    def getChildren(self, parent, includeTypes=None, **kwargs):
+        self._call()
+        yield from self._children(parent, includeTypes or ["file", "folder"])
+
+    def getWikiHeaders(self, owner):
+        self._call()
+        return [DictObject(header) for header in self.wiki_headers]
+
+    def getWiki(self, owner, subpageId=None):
+        self._call()
+        wiki_id = subpageId or "1000"
+        title = next(h["title"] for h in self.wiki_headers if h["id"] == wiki_id)
+        return DictObject(
+            id=wiki_id,
+            title=title,
+            etag=f"wiki-{owner}-{wiki_id}",
+            markdown=f"# {title}\n\n" + "Lorem ipsum dolor sit amet. " * 200,
+        )
+
+    # --- Synthetic hierarchy ------------------------------------------------
+
+    def _project(self, entity_id):
+        if entity_id not in self.projects:
+            raise _http_error(404, f"Entity {entity_id} does not exist")
+        return self.projects[entity_id]
+
+    def _entity_etag(self, entity_id):
+        if entity_id in self.projects:
+            return self.projects[entity_id]["etag"]
+        return f"etag-{entity_id}"
+
+    def _children(self, parent_id, include_types):
+        """
+        List a container's children.
+
+        Folder IDs encode their path, e.g. "syn1000000.f1.f0", so the tree needs
+        no storage.
+        """
+        depth = parent_id.count(".f")
+        children = []
+        if "folder" in include_types and depth < self.folder_depth:
+            children += [
+                {
+                    "id": f"{parent_id}.f{i}",
+                    "name": f"folder-{i}",
+                    "type": "org.sagebionetworks.repo.model.Folder",
+                    "createdOn": "2024-01-01T00:00:00.000Z",
+                    "modifiedOn": f"2024-0{1 + depth}-01T00:00:00.000Z",
+                }
+                for i in range(self.folder_fanout)
+            ]
+        if "file" in include_types and depth > 0:
+            children += [
+                {
+                    "id": f"{parent_id}.file{i}",
+                    "name": f"file-{i}.csv",
+                    "type": "org.sagebionetworks.repo.model.FileEntity",
+                    "createdOn": "2024-01-01T00:00:00.000Z",
+                    "modifiedOn": f"2024-0{1 + depth}-15T00:00:00.000Z",
+                    "size": 1024 * (1 + i % 50),
+                }
+                for i in range(self.files_per_folder)
+            ]
+        if "table" in include_types and depth == 0:
+            children.append(
+                {
+                    "id": f"{parent_id}.t0",
+                    "name": "Leaderboard",
+                    "type": "org.sagebionetworks.repo.model.table.TableEntity",
+                }
+            )
+        return sorted(children, key=lambda child: child["name"])
+
+
+def _http_error(status_code, message):
+    """Build the error synapseclient raises for an HTTP error status."""
+    response = requests.Response()
+    response.status_code = status_code
+    return SynapseHTTPError(f"{status_code} Client Error: {message}", response=response)
@@ -0,0 +1,361 @@
+"""
+Load test for the Synapse Wiki Annotator app.
+
+Drives many headless app sessions at once with Streamlit's testing API, all
+against one `FakeSynapse` backend shared through the process-wide client
+cache. Each session walks through a curator's typical visit: landing page,
+search, open a project, switch wiki pages, save an annotation and go back.
+For each concurrency level the script reports rerun latency percentiles and
+peak memory, and writes them to a JSON file:
+
+    python -m benchmarks.load_test --sessions 1 5 10 25 --latency 0.02
+
+Each level runs in a process of its own, after one untimed visit that
+imports and compiles everything, so that its memory figures can be compared
+with those of the other levels.
+
+Running sessions side by side relies on Streamlit internals (see
+`shared_app_runtime`); it was written against Streamlit 1.65.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager, nullcontext
+from unittest import mock
+
+# The app runs outside `streamlit run` here; silence the bare-mode warnings
+logging.disable(logging.WARNING)
+
+import streamlit as st
+from streamlit.runtime.runtime import Runtime
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.runtime.secrets import Secrets
+from streamlit.testing.v1 import AppTest, app_test
+from streamlit.testing.v1.util import patch_config_options
+
+from benchmarks.fake_synapse import FakeSynapse
+from benchmarks.run import reset_caches
+from src import synapse_service as service
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+SEARCHES = ["cancer", "dream", "imaging challenge", "active", "syn10000"]
+
+
+def _max_rss_mb():
+    """Peak resident memory of this process so far."""
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (
+        2**20 if sys.platform == "darwin" else 2**10
+    )
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+@contextmanager
+def shared_app_runtime(secrets):
+    """
+    Let AppTest sessions run side by side in one process.
+
+    AppTest expects one test at a time. Each run installs its own stand-in
+    Runtime singleton and removes it when done, turns on the process-wide
+    `global.appTest` option until it is done, swaps `st.secrets`, and
+    compiles the script again. Here a session whose runtime was removed by
+    another falls back to the last one installed, and `global.appTest` stays
+    on until every session is done; otherwise a run that finishes turns it
+    off under the others, whose widgets then go unrecorded. The secrets are
+    set once for every session, and the compiled script is shared, as it is
+    between the sessions of a real server.
+    """
+    installed = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            installed[:] = [cls._instance]
+        if not installed:
+            raise RuntimeError("Runtime hasn't been created!")
+        return installed[0]
+
+    for owner, attr in (
+        (Runtime, "instance"),
+        (Runtime, "exists"),
+        (ScriptCache, "get_bytecode"),
+        (app_test, "patch_config_options"),
+    ):
+        if not hasattr(owner, attr):
+            raise RuntimeError(
+                f"This Streamlit version has no {owner.__name__}.{attr}, which "
+                "the load test patches to run sessions side by side"
+            )
+
+    script_cache = ScriptCache()
+    get_bytecode = ScriptCache.get_bytecode
+    shared_secrets = Secrets()
+    shared_secrets._secrets = dict(secrets)
+    with ExitStack() as stack:
+        stack.enter_context(
+            mock.patch.object(Runtime, "instance", classmethod(instance))
+        )
+        stack.enter_context(
+            mock.patch.object(Runtime, "exists", classmethod(lambda cls: True))
+        )
+        stack.enter_context(
+            mock.patch.object(
+                ScriptCache,
+                "get_bytecode",
+                lambda self, path: get_bytecode(script_cache, path),
+            )
+        )
+        stack.enter_context(mock.patch.object(st, "secrets", shared_secrets))
+        stack.enter_context(patch_config_options({"global.appTest": True}))
+        stack.enter_context(
+            mock.patch.object(
+                app_test, "patch_config_options", lambda overrides: nullcontext()
+            )
+        )
+        yield
+
+
+class Session:
+    """One simulated curator, recording how long each rerun of the app takes."""
+
+    def __init__(self, fake, rng, timeout):
+        self.fake = fake
+        self.rng = rng
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.timings = []  # (step, seconds)
+        self.errors = []  # Exceptions raised by the app
+        self.harness_errors = []  # Exceptions raised by AppTest itself
+
+    def _rerun(self, step, action=None):
+        """Apply `action` to the app, rerun it and time the rerun."""
+        start = time.perf_counter()
+        try:
+            (action or self.app.run)()
+        except Exception as e:
+            self.harness_errors.append(f"{step}: {e!r}")
+            return False
+        self.timings.append((step, time.perf_counter() - start))
+        if self.app.exception:
+            self.errors.append(f"{step}: {self.app.exception[0].message}")
+            return False
+        return True
+
+    def visit(self):
+        """Walk through one visit to the dashboard."""
+        app = self.app
+        if not self._rerun("landing"):
+            return
+
+        search = next(
+            (w for w in app.text_input if w.label.startswith("🔍 Search")), None
+        )
+        if search is not None:
+            search.set_value(self.rng.choice(SEARCHES))
+            if not self._rerun("search"):
+                return
+
+        # Opening a project from the table is a selection event, which the
+        # testing API cannot send, so set the state the selection handler sets
+        editable = [
+            pid for pid, project in self.fake.projects.items() if project["can_edit"]
+        ]
+        project_id = self.rng.choice(editable)
+        app.session_state["selected_project_id"] = project_id
+        app.session_state["selected_project_name"] = self.fake.projects[project_id][
+            "name"
+        ]
+        if not self._rerun("open_project"):
+            return
+
+        for _ in range(2):
+            pages = [
+                b
+                for b in app.sidebar.button
+                if (b.key or "").startswith("wiki_page_") and b.proto.type != "primary"
+            ]
+            if not pages:
+                break
+            if not self._rerun("switch_wiki_page", self.rng.choice(pages).click().run):
+                return
+
+        save = next((b for b in app.button if "Save Annotation" in b.label), None)
+        if save is not None and not self._rerun("save_annotation", save.click().run):
+            return
+
+        back = next((b for b in app.button if "List All Challenge" in b.label), None)
+        if back is not None:
+            self._rerun("back_to_list", back.click().run)
+
+
+def run_level(num_sessions, args):
+    """Run `num_sessions` concurrent sessions and summarize their reruns."""
+    fake = FakeSynapse(
+        args.projects,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    with mock.patch.object(
+        service.synapseclient, "Synapse", lambda: fake
+    ), shared_app_runtime({"SYNAPSE_AUTH_TOKEN": "load-test"}):
+        # One untimed visit imports and compiles everything, so that the
+        # memory traced below is what the sessions themselves use
+        Session(fake, random.Random(args.seed), args.timeout).visit()
+        reset_caches()
+        service.get_synapse_client.clear()
+        service.get_user_profile.clear()
+        service._get_project_store.clear()
+        rss_before = _max_rss_mb()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        sessions = [
+            Session(fake, random.Random(args.seed + i), args.timeout)
+            for i in range(num_sessions)
+        ]
+
+        def drive(session):
+            for _ in range(args.visits):
+                session.visit()
+
+        with ThreadPoolExecutor(max_workers=num_sessions) as executor:
+            list(executor.map(drive, sessions))
+        wall = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    timings = [t for session in sessions for t in session.timings]
+    errors = [e for session in sessions for e in session.errors]
+    harness_errors = [e for session in sessions for e in session.harness_errors]
+    seconds = [t for _, t in timings] or [0.0]
+    by_step = {}
+    for step, t in timings:
+        by_step.setdefault(step, []).append(t)
+
+    return {
+        "sessions": num_sessions,
+        "reruns": len(timings),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "harness_errors": len(harness_errors),
+        "harness_error_samples": harness_errors[:5],
+        "wall_seconds": wall,
+        "reruns_per_second": len(timings) / wall if wall else None,
+        "p50": _percentile(seconds, 0.5),
+        "p95": _percentile(seconds, 0.95),
+        "p99": _percentile(seconds, 0.99),
+        "max": max(seconds),
+        "steps": {
+            step: {
+                "reruns": len(values),
+                "p50": _percentile(values, 0.5),
+                "p95": _percentile(values, 0.95),
+                "mean": statistics.mean(values),
+            }
+            for step, values in sorted(by_step.items())
+        },
+        # Allocated by the sessions, after the warm-up visit
+        "peak_traced_mb": peak / 2**20,
+        # This level's process, before and after the sessions ran
+        "warm_rss_mb": rss_before,
+        "max_rss_mb": _max_rss_mb(),
+        "threads_at_end": threading.active_count(),
+    }
+
+
+def run_level_process(num_sessions, args, argv):
+    """Run one level in a fresh process and return its summary."""
+    command = [sys.executable, "-m", "benchmarks.load_test", *argv]
+    command += ["--level", str(num_sessions)]
+    output = subprocess.run(
+        command, cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    print(
+        f"{num_sessions:>4} sessions  {result['reruns']:>5} reruns  "
+        f"p50 {result['p50'] * 1000:8.1f} ms  p95 {result['p95'] * 1000:8.1f} ms  "
+        f"peak {result['peak_traced_mb']:7.1f} MiB  "
+        f"rss +{result['max_rss_mb'] - result['warm_rss_mb']:6.1f} MiB  "
+        f"errors {result['errors']}"
+        + (
+            f" (+{result['harness_errors']} harness)"
+            if result["harness_errors"]
+            else ""
+        ),
+        file=sys.stderr,
+    )
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--sessions",
+        type=int,
+        nargs="+",
+        default=[1, 5, 10, 25],
+        help="Concurrency levels to test",
+    )
+    parser.add_argument("--visits", type=int, default=2, help="Visits per session")
+    parser.add_argument("--projects", type=int, default=500, help="Projects to fake")
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="Seconds added to every call"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.01, help="Up to this many extra seconds"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Share of calls that fail"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic data seed")
+    parser.add_argument(
+        "--timeout", type=float, default=120, help="Seconds allowed per rerun"
+    )
+    parser.add_argument(
+        "--output",
+        default="benchmarks/load_results.json",
+        help="Where to write the JSON results",
+    )
+    parser.add_argument("--level", type=int, help=argparse.SUPPRESS)
+    argv = sys.argv[1:] if argv is None else argv
+    args = parser.parse_args(argv)
+
+    if args.level is not None:
+        print(json.dumps(run_level(args.level, args)))
+        return
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "level")
+        },
+        "levels": [
+            run_level_process(num_sessions, args, argv)
+            for num_sessions in args.sessions
+        ],
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['levels'])} levels to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Offline benchmarks for the Synapse Wiki Annotator service layer.
+
+Runs the landing page snapshot, search and sort, folder, wiki, table and
+annotation code paths against `FakeSynapse` at several project counts, and
+writes the timings to a JSON file:
+
+    python -m benchmarks.run --projects 100 1000 5000 --latency 0.02
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Keep the benchmark's persistent cache away from the app's
+os.environ.setdefault(
+    "CHALLENGE_DASHBOARD_CACHE_DIR", tempfile.mkdtemp(prefix="annotator-bench-")
+)
+
+# The service runs outside `streamlit run` here; silence the bare-mode warnings
+logging.disable(logging.WARNING)
+
+import streamlit as st
+
+from benchmarks.fake_synapse import FakeSynapse
+from src import synapse_service as service
+from src.cache import TTLCache
+from src.metrics import InstrumentedClient, metrics
+from src.scheduler import RequestScheduler, ScheduledClient
+from src.search import ProjectSearchIndex
+
+SEARCH_QUERIES = ["cancer", "dream chal", "active data to model", "syn100", "imagng"]
+
+
+def reset_caches():
+    """Empty every cache the service keeps, so each run starts cold."""
+    st.cache_data.clear()
+    service.get_disk_cache().delete_prefix("")
+    for value in vars(service).values():
+        if isinstance(value, TTLCache):
+            value.clear()
+    with service._stale_lock:
+        service._stale_projects.clear()
+
+
+def synapse_calls():
+    """Count the Synapse calls, and failed calls, recorded since the last reset."""
+    operations = metrics.snapshot()["operations"]
+    calls = [op for name, op in operations.items() if name.startswith("syn.")]
+    return sum(op["calls"] for op in calls), sum(op["errors"] for op in calls)
+
+
+def bench(results, name, num_projects, body, setup=None, repeat=3):
+    """Time `body(setup())` `repeat` times and append a summary to `results`."""
+    seconds = []
+    calls = errors = 0
+    for _ in range(repeat):
+        state = setup() if setup else None
+        metrics.reset()
+        start = time.perf_counter()
+        body(state)
+        seconds.append(time.perf_counter() - start)
+        run_calls, run_errors = synapse_calls()
+        calls += run_calls
+        errors += run_errors
+    results.append(
+        {
+            "benchmark": name,
+            "projects": num_projects,
+            "repeat": repeat,
+            "min": min(seconds),
+            "median": statistics.median(seconds),
+            "max": max(seconds),
+            "synapse_calls": calls / repeat,
+            "synapse_errors": errors / repeat,
+        }
+    )
+    print(
+        f"{name:<28} {num_projects:>6} projects  "
+        f"median {statistics.median(seconds) * 1000:9.1f} ms  "
+        f"{calls / repeat:8.1f} calls",
+        file=sys.stderr,
+    )
+
+
+def run_suite(num_projects, args):
+    """
+    Run every benchmark against a fake deployment of `num_projects` projects.
+
+    The loaders are called through the same error-handling wrappers the app
+    uses, so injected errors are counted rather than aborting the run. Calls
+    go through a request scheduler, as in the app, which retries injected
+    errors; it is only rate limited if `args.rate` is set.
+    """
+    fake = FakeSynapse(
+        num_projects,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    syn = ScheduledClient(
+        InstrumentedClient(fake), RequestScheduler(rate=args.rate or None)
+    )
+    project_ids = list(fake.projects)
+    results = []
+
+    def cold():
+        reset_caches()
+
+    # Landing page: build from scratch, then refresh after a few edits
+    bench(
+        results,
+        "snapshot_build_cold",
+        num_projects,
+        lambda _: service.build_project_snapshot(syn),
+        cold,
+        args.repeat,
+    )
+    snapshot = service.build_project_snapshot(syn)
+    rng = random.Random(args.seed)
+
+    def touched():
+        # A fresh base each run, so earlier runs' edits aren't refreshed again
+        reset_caches()
+        base = service.build_project_snapshot(syn)
+        for project_id in rng.sample(project_ids, max(1, num_projects // 10)):
+            fake.touch(project_id)
+        return base
+
+    bench(
+        results,
+        "snapshot_refresh_10pct",
+        num_projects,
+        lambda base: service.refresh_project_snapshot(syn, base),
+        touched,
+        args.repeat,
+    )
+
+    # Search and sort, as the landing page does on every rerun
+    bench(
+        results,
+        "search_index_build",
+        num_projects,
+        lambda _: ProjectSearchIndex(snapshot),
+        repeat=args.repeat,
+    )
+    index = ProjectSearchIndex(snapshot)
+
+    def search_and_sort(_):
+        for query in SEARCH_QUERIES:
+            for sort_by in service.SORT_OPTIONS:
+                service.sort_projects(
+                    service.search_projects(snapshot, index, query), sort_by
+                )
+
+    bench(results, "search_and_sort", num_projects, search_and_sort, None, args.repeat)
+
+    # Project page loaders
+    project_id = project_ids[0]
+    bench(
+        results,
+        "folder_first_page_cold",
+        num_projects,
+        lambda _: service.fetch_folder_contents(syn, f"{project_id}.f0"),
+        cold,
+        args.repeat,
+    )
+    bench(
+        results,
+        "folder_summary_cold",
+        num_projects,
+        lambda _: service.fetch_folder_summary(syn, f"{project_id}.f0"),
+        cold,
+        args.repeat,
+    )
+
+    def open_wiki(_):
+        tree = service.get_wiki_tree(syn, project_id)
+        for wiki_id in tree.titles:
+            service.fetch_wiki_page(syn, project_id, wiki_id)
+
+    bench(results, "wiki_all_pages_cold", num_projects, open_wiki, cold, args.repeat)
+    bench(results, "wiki_all_pages_warm", num_projects, open_wiki, None, args.repeat)
+
+    table_id = f"{project_id}.t0"
+
+    def preview_table(_):
+        preview = service.fetch_table_preview(syn, table_id)
+        if preview:
+            service.fetch_table_rows(syn, table_id, preview["etag"], max_pages=4)
+
+    bench(results, "table_preview_cold", num_projects, preview_table, cold, args.repeat)
+
+    # Annotation writes
+    editable = [pid for pid in project_ids if fake.projects[pid]["can_edit"]]
+
+    def save_annotations(_):
+        for pid in editable[:20]:
+            service.update_annotation(syn, pid, "status", "Active")
+
+    bench(
+        results,
+        "update_annotation_x20",
+        num_projects,
+        save_annotations,
+        cold,
+        args.repeat,
+    )
+    bench(
+        results,
+        "bulk_update_x100",
+        num_projects,
+        lambda _: service.bulk_update_annotations(
+            syn, editable[:100], {"status": "Closed"}
+        ),
+        cold,
+        args.repeat,
+    )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--projects",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 5000],
+        help="Project counts to benchmark",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds added to every call"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="Up to this many extra seconds"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Share of calls that fail"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="Requests per second allowed by the scheduler (0: unlimited)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic data seed")
+    parser.add_argument(
+        "--output",
+        default="benchmarks/results.json",
+        help="Where to write the JSON results",
+    )
+    args = parser.parse_args(argv)
+
+    results = []
+    for num_projects in args.projects:
+        results += run_suite(num_projects, args)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+            "rate": args.rate,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "max_workers": service.MAX_WORKERS,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
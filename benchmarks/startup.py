@@ -0,0 +1,152 @@
+"""
+Startup benchmark for the Synapse Wiki Annotator app.
+
+Starts fresh Python processes to time what a new server pays before the first
+page is shown: importing the app's modules, logging in, and rendering up to
+the page title on the first run and on a rerun. The app runs headless with
+Streamlit's testing API against `FakeSynapse`. Results are written to a JSON
+file so they can be compared over time:
+
+    python -m benchmarks.startup --repeat 5
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+APP_MODULES = ["src.auth", "src.synapse_service", "src.metrics", "src.scheduler"]
+HEAVY_MODULES = ["pandas", "synapseclient"]  # Should not load before first use
+
+
+def measure_imports():
+    """Time importing the modules the app script imports itself."""
+    import streamlit  # noqa: F401  Already loaded by the server before any run
+
+    start = time.perf_counter()
+    for name in APP_MODULES:
+        __import__(name)
+    return {
+        "app_imports": time.perf_counter() - start,
+        "heavy_modules_loaded": [
+            name
+            for name in HEAVY_MODULES
+            if name in sys.modules and type(sys.modules[name]).__name__ != "_LazyModule"
+        ],
+    }
+
+
+def measure_app(num_projects, latency):
+    """
+    Time the first run and a rerun of the app, and read back its startup metrics.
+
+    The fake backend imports pandas and synapseclient itself, so the import
+    savings show up in `measure_imports` rather than here.
+    """
+    from unittest import mock
+
+    # The app runs outside `streamlit run` here; silence the bare-mode warnings
+    logging.disable(logging.WARNING)
+    from streamlit.testing.v1 import AppTest
+
+    from benchmarks.fake_synapse import FakeSynapse
+
+    fake = FakeSynapse(num_projects, latency=latency)
+    app = AppTest.from_file(APP_PATH, default_timeout=120)
+    app.secrets["SYNAPSE_AUTH_TOKEN"] = "startup-benchmark"
+    result = {}
+    with mock.patch("synapseclient.Synapse", lambda: fake):
+        for step in ("first_run", "rerun"):
+            start = time.perf_counter()
+            app.run()
+            result[step] = time.perf_counter() - start
+            if app.exception:
+                raise RuntimeError(app.exception[0].message)
+
+    from src.metrics import metrics
+
+    # Each phase was reached once on the first run and once on the rerun
+    for name, op in metrics.snapshot()["operations"].items():
+        if name.startswith("startup."):
+            phase = name.removeprefix("startup.")
+            result[f"{phase}_cold"] = op["first"]
+            result[f"{phase}_rerun"] = op["mean"] * op["calls"] - op["first"]
+    return result
+
+
+def run_child(mode, args):
+    """Measure one fresh process and return its timings."""
+    command = [sys.executable, "-m", "benchmarks.startup", "--child", mode]
+    command += ["--projects", str(args.projects), "--latency", str(args.latency)]
+    output = subprocess.run(
+        command, cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    """Median and worst value of each timing across processes."""
+    summary = {}
+    for key in samples[0]:
+        values = [sample[key] for sample in samples]
+        if all(isinstance(value, (int, float)) for value in values):
+            summary[key] = {"median": statistics.median(values), "max": max(values)}
+        else:
+            summary[key] = values[0]
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--repeat", type=int, default=5, help="Processes to start")
+    parser.add_argument("--projects", type=int, default=500, help="Projects to fake")
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="Seconds added to every call"
+    )
+    parser.add_argument(
+        "--output",
+        default="benchmarks/startup_results.json",
+        help="Where to write the JSON results",
+    )
+    parser.add_argument("--child", choices=["imports", "app"], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child == "imports":
+        print(json.dumps(measure_imports()))
+        return
+    if args.child == "app":
+        print(json.dumps(measure_app(args.projects, args.latency)))
+        return
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "child")
+        },
+    }
+    for mode in ("imports", "app"):
+        report[mode] = summarize([run_child(mode, args) for _ in range(args.repeat)])
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    imports, app = report["imports"], report["app"]
+    print(
+        f"app imports {imports['app_imports']['median'] * 1000:7.1f} ms  "
+        f"cold first paint {app['first_paint_cold']['median'] * 1000:7.1f} ms  "
+        f"rerun first paint {app['first_paint_rerun']['median'] * 1000:7.1f} ms  "
+        f"heavy modules loaded: {', '.join(imports['heavy_modules_loaded']) or 'none'}",
+        file=sys.stderr,
+    )
+    print(f"Wrote startup results to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,44 @@
 """Authentication utilities for Synapse Wiki Annotator."""
 
+import os
+
 import streamlit as st
 from src import synapse_service as service
 
+TOKEN_NAME = "SYNAPSE_AUTH_TOKEN"  # Key in secrets.toml, and environment variable
+
+
+def get_auth_token():
+    """
+    Find the Synapse auth token without requiring a Streamlit session.
+
+    Looks in Streamlit's secrets (`.streamlit/secrets.toml`) first, then in the
+    SYNAPSE_AUTH_TOKEN environment variable.
+
+    Returns:
+        str | None: The token, or None if neither has one.
+    """
+    try:
+        if TOKEN_NAME in st.secrets:
+            return st.secrets[TOKEN_NAME]
+    except FileNotFoundError:
+        # No secrets.toml at all
+        pass
+    return os.environ.get(TOKEN_NAME)
+
 
 def require_auth():
     """
-    Ensures user is authenticated. Gets token from secrets or shows error.
+    Ensures user is authenticated. Gets token from `get_auth_token` or shows error.
     Also displays the logged-in user info in the sidebar.
 
     Returns:
         synapseclient.Synapse: Authenticated Synapse client
     """
-    if "SYNAPSE_AUTH_TOKEN" in st.secrets:
-        auth_token = st.secrets["SYNAPSE_AUTH_TOKEN"]
-    else:
+    auth_token = get_auth_token()
+    if not auth_token:
         st.error(
-            "🔐 Authentication token not found. Please configure `.streamlit/secrets.toml` with your SYNAPSE_AUTH_TOKEN."
+            "🔐 Authentication token not found. Please configure `.streamlit/secrets.toml` with your SYNAPSE_AUTH_TOKEN, or set it as an environment variable."
         )
         st.stop()
 
@@ -31,7 +53,7 @@ def require_auth():
     # Display logged-in user info in sidebar
     with st.sidebar:
         try:
-            user_profile = syn.getUserProfile()
+            user_profile = service.get_user_profile(auth_token)
             username = user_profile.get("userName", "Unknown User")
             st.success(f"✅ Logged in as: **{username}**")
         except:
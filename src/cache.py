@@ -0,0 +1,383 @@
+"""Caching utilities for Synapse Wiki Annotator."""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from src.metrics import metrics
+
+_MISSING = object()
+
+
+class DiskCache:
+    """
+    A size-bounded key/value store kept in a SQLite file.
+
+    Every entry has its own TTL. When the total size of stored values goes
+    over `max_bytes`, expired entries are dropped and then the least recently
+    read ones, until it fits again. The total is kept as a running count and
+    only summed from the file before evicting. Storage errors are treated as
+    cache misses so a broken or read-only cache directory never takes the app
+    down with it.
+
+    Inside `batch()`, the writes made by that thread, and by any thread the
+    batch runs work on, are held in memory and committed together when the
+    outermost batch ends; reads within the batch see them straight away.
+    Other threads keep writing straight to the file.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.path = os.path.join(directory, "cache.sqlite3")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._local = threading.local()  # The batch each thread writes into
+        self._open = set()  # Batches not yet committed
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # One connection for the process, used under `_lock`
+            self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            with self._conn as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS entries (
+                        key TEXT PRIMARY KEY,
+                        value BLOB NOT NULL,
+                        size INTEGER NOT NULL,
+                        expires_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                    """)
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS entries_accessed_at "
+                    "ON entries (accessed_at)"
+                )
+                self._bytes = self._total(conn)
+            self.enabled = True
+        except (OSError, sqlite3.Error):
+            self.enabled = False
+
+    @staticmethod
+    def _total(conn):
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key):
+        """Return the value stored under `key`, or None if missing or expired."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                batch = self._batch()
+                pending = batch.pending.get(key) if batch else None
+                if pending is not None:
+                    row = pending
+                else:
+                    row = self._conn.execute(
+                        "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+                    ).fetchone()
+                if row is None or row[1] < now:
+                    if row is not None:
+                        self._delete(key)
+                    metrics.record_cache("disk", hit=False)
+                    return None
+                if batch:
+                    batch.touched[key] = now
+                else:
+                    with self._conn as conn:
+                        conn.execute(
+                            "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                            (now, key),
+                        )
+            metrics.record_cache("disk", hit=True)
+            return pickle.loads(row[0])
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError):
+            return None
+
+    def set(self, key, value, ttl):
+        """Store `value` under `key` for `ttl` seconds, evicting old entries if needed."""
+        if not self.enabled:
+            return
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        try:
+            with self._lock:
+                entry = (blob, time.time() + ttl)
+                batch = self._batch()
+                if batch:
+                    batch.pending[key] = entry
+                else:
+                    self._write({key: entry}, {})
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def batch(self):
+        """
+        Hold this thread's writes until the outermost batch ends, then commit them together.
+
+        Yields the batch; call work through its `run` method to have the writes
+        of other threads held in it as well.
+        """
+        current = self._batch()
+        if current is not None:
+            yield current
+            return
+        batch = _Batch(self)
+        with self._lock:
+            self._open.add(batch)
+        self._local.batch = batch
+        try:
+            yield batch
+        finally:
+            self._local.batch = None
+            with self._lock:
+                self._open.discard(batch)
+                # Writes made after this point go straight to the file
+                batch.closed = True
+                try:
+                    self._write(batch.pending, batch.touched)
+                except sqlite3.Error:
+                    pass
+
+    def _batch(self):
+        """Return the batch this thread is writing into, if it is still open."""
+        batch = getattr(self._local, "batch", None)
+        return None if batch is None or batch.closed else batch
+
+    def _write(self, pending, touched):
+        """Write entries and access times in one transaction, then evict if needed."""
+        if not self.enabled or not (pending or touched):
+            return
+        now = time.time()
+        with self._conn as conn:
+            for key, (blob, expires_at) in pending.items():
+                old = conn.execute(
+                    "SELECT size FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                    (key, blob, len(blob), expires_at, now),
+                )
+                self._bytes += len(blob) - (old[0] if old else 0)
+            conn.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in touched.items()],
+            )
+            if self._bytes > self.max_bytes:
+                self._evict(conn, now)
+
+    def delete(self, key):
+        """Remove a single entry."""
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                self._delete(key)
+        except sqlite3.Error:
+            pass
+
+    def _delete(self, key):
+        for batch in self._open:
+            batch.pending.pop(key, None)
+            batch.touched.pop(key, None)
+        with self._conn as conn:
+            row = conn.execute(
+                "DELETE FROM entries WHERE key = ? RETURNING size", (key,)
+            ).fetchone()
+        if row is not None:
+            self._bytes -= row[0]
+
+    def delete_prefix(self, prefix):
+        """Remove every entry whose key starts with `prefix`."""
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                for batch in self._open:
+                    for key in [k for k in batch.pending if k.startswith(prefix)]:
+                        del batch.pending[key]
+                with self._conn as conn:
+                    conn.execute(
+                        "DELETE FROM entries WHERE substr(key, 1, ?) = ?",
+                        (len(prefix), prefix),
+                    )
+                    self._bytes = self._total(conn)
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then the least recently read until under budget."""
+        conn.execute("DELETE FROM entries WHERE expires_at < ?", (now,))
+        # Other processes sharing the file may have written or evicted too
+        total = self._total(conn)
+        if total > self.max_bytes:
+            rows = conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at ASC"
+            )
+            evicted = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self._bytes = total
+
+
+class _Batch:
+    """Writes to a `DiskCache` held back until the batch they belong to ends."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.pending = {}  # key -> (blob, expires_at)
+        self.touched = {}  # key -> accessed_at
+        self.closed = False
+
+    def run(self, func, *args, **kwargs):
+        """Call `func`, holding the cache writes it makes in this batch."""
+        local = self.cache._local
+        previous = getattr(local, "batch", None)
+        local.batch = self
+        try:
+            return func(*args, **kwargs)
+        finally:
+            local.batch = previous
+
+
+class TTLCache:
+    """
+    A thread-safe in-memory cache with a TTL per entry and an entry limit.
+
+    Once `maxsize` entries are stored, the least recently used one is evicted
+    to make room for the next. With `max_bytes`, entries are also evicted
+    until the values, as measured by `sizeof`, fit within that budget. Hits
+    and misses are reported to the metrics registry under `name`, if given.
+    """
+
+    def __init__(self, maxsize, ttl, max_bytes=None, sizeof=len, name=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value stored under `key`, or `default` if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                self._pop(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if self.name:
+            metrics.record_cache(self.name, hit=entry is not None)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value, ttl=None):
+        """Store `value` under `key`, for `ttl` seconds if given."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.maxsize or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, key):
+        """Remove a single entry."""
+        with self._lock:
+            self._pop(key)
+
+    def delete_where(self, predicate):
+        """Remove every entry whose key satisfies `predicate`."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._pop(key)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+
+class SingleFlight:
+    """
+    Share the result of a call among concurrent callers asking for the same thing.
+
+    The first caller for a key runs the call. Callers that arrive with the same
+    key while it is running wait for it and get its result, or its exception,
+    instead of making the call again. Nothing is kept once the call returns.
+    Joined and fresh calls are reported to the metrics registry under `name`,
+    as hits and misses, if given.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """Return `func(*args, **kwargs)`, or the result of the call already running under `key`."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if self.name:
+            metrics.record_cache(self.name, hit=not leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class _Call:
+    """One call in flight, and its outcome once it is done."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
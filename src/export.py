@@ -0,0 +1,221 @@
+"""
+Export the project annotation snapshot without starting the app.
+
+Crawls the Project View the way the landing page does and writes one row per
+project: its name and ID, whether it has annotations, whether the logged-in
+user can edit it, one column per annotation key of the view schema, and the
+etag the row was read at. The token is found as in the app: in
+`.streamlit/secrets.toml` or in the SYNAPSE_AUTH_TOKEN environment variable.
+
+    python -m src.export projects.csv
+    python -m src.export projects.parquet --incremental
+
+With `--incremental`, the previous export at the same path is read back and
+only projects added or changed since then, or that failed last time, are
+fetched again.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+# The service runs outside `streamlit run` here; silence the bare-mode warnings
+logging.disable(logging.WARNING)
+
+import pandas as pd
+
+from src import auth, synapse_service as service
+from src.scheduler import Throttled
+
+FORMATS = ("csv", "jsonl", "parquet")
+CHUNK_ROWS = 1000  # Rows written at a time
+LEADING_COLUMNS = ["Project ID", "Project Name", "Has Annotations", "Can Edit"]
+TRAILING_COLUMNS = ["Etag", "Modified On", "Error", "Error Kind"]
+
+
+def export_frame(snapshot, keys):
+    """
+    Flatten a project snapshot into export rows.
+
+    Args:
+        keys (list[str]): Annotation keys, one column each, in order.
+    """
+    annotations = pd.DataFrame(
+        list(snapshot["Annotations"]), index=snapshot.index
+    ).reindex(columns=keys)
+    frame = pd.concat(
+        [snapshot[LEADING_COLUMNS], annotations, snapshot[TRAILING_COLUMNS]], axis=1
+    )
+    return frame.reset_index(drop=True)
+
+
+def snapshot_from_export(frame, keys):
+    """Rebuild a project snapshot from the rows of a previous export."""
+    frame = frame.copy()
+    for column in ("Has Annotations", "Can Edit"):
+        frame[column] = frame[column].astype(str).str.lower().isin(["true", "1"])
+    values = frame.reindex(columns=keys).astype("string")
+    # Exports written before multi-value annotations were normalized hold the
+    # view's JSON lists
+    frame["Annotations"] = [
+        service.normalize_annotations(
+            {
+                key: value
+                for key, value in row.items()
+                if pd.notna(value) and value != ""
+            }
+        )
+        for row in (values.to_dict("records") if keys else [{}] * len(frame))
+    ]
+    frame["Error"] = frame["Error"].where(
+        frame["Error"].notna() & (frame["Error"] != "")
+    )
+    return service.snapshot_frame(frame)
+
+
+def detect_format(path, fmt=None):
+    """Return the export format named by `fmt`, or by the extension of `path`."""
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in FORMATS:
+        raise ValueError(
+            f"Unknown export format {fmt!r}; use one of {', '.join(FORMATS)}"
+        )
+    return fmt
+
+
+def read_export(path, fmt):
+    """Read a previous export, or return None if there is none."""
+    if not os.path.exists(path):
+        return None
+    if fmt == "csv":
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+    if fmt == "jsonl":
+        return pd.read_json(path, lines=True, dtype=False)
+    return pd.read_parquet(path)
+
+
+def write_export(frame, path, fmt, chunk_rows=CHUNK_ROWS):
+    """
+    Write export rows to `path`, `chunk_rows` rows at a time.
+
+    The file is written next to `path` and moved into place once complete, so
+    readers never see a partial export.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=f".{fmt}.tmp")
+    os.close(fd)
+    try:
+        if fmt == "parquet":
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise RuntimeError("Parquet export requires pyarrow") from None
+            # Strings throughout, so every chunk has the same schema
+            frame = frame.astype("string")
+            schema = pa.Schema.from_pandas(frame, preserve_index=False)
+            with pq.ParquetWriter(tmp_path, schema) as writer:
+                for start in range(0, len(frame), chunk_rows):
+                    writer.write_table(
+                        pa.Table.from_pandas(
+                            frame.iloc[start : start + chunk_rows],
+                            schema=schema,
+                            preserve_index=False,
+                        )
+                    )
+        else:
+            with open(tmp_path, "w", newline="") as f:
+                if fmt == "csv":
+                    # The header is written even when there are no rows
+                    frame.head(0).to_csv(f, index=False)
+                for start in range(0, len(frame), chunk_rows):
+                    chunk = frame.iloc[start : start + chunk_rows]
+                    if fmt == "csv":
+                        chunk.to_csv(f, header=False, index=False)
+                    else:
+                        f.write(chunk.to_json(orient="records", lines=True))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("output", help="File to write (.csv, .jsonl or .parquet)")
+    parser.add_argument(
+        "--format", choices=FORMATS, help="Export format, if not the file extension"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch projects that changed since the export at OUTPUT",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=service.MAX_WORKERS,
+        help="Concurrent Synapse requests",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Read everything from Synapse instead of the app's cache",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        fmt = detect_format(args.output, args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    token = auth.get_auth_token()
+    if not token:
+        sys.exit(
+            f"Authentication token not found. Set {auth.TOKEN_NAME} in "
+            ".streamlit/secrets.toml or in the environment."
+        )
+    if args.fresh:
+        # Read everything from Synapse through a cache of our own, so that the
+        # shared cache a running dashboard relies on is left untouched
+        fresh_cache = tempfile.TemporaryDirectory(prefix="export-cache-")
+        service.CACHE_DIR = fresh_cache.name
+        service.get_disk_cache.clear()
+    syn = service.get_synapse_client(token)
+    if syn is None:
+        sys.exit("Failed to authenticate with Synapse.")
+
+    start = time.perf_counter()
+    try:
+        keys = service.fetch_view_schema(syn)
+    except Throttled:
+        sys.exit("Synapse is limiting requests right now; try again later.")
+    previous = read_export(args.output, fmt) if args.incremental else None
+    if previous is not None and not previous.empty:
+        base = snapshot_from_export(previous, keys)
+        snapshot = service.refresh_project_snapshot(syn, base, args.workers)
+        if snapshot is base:
+            sys.exit("Could not query the Project View.")
+        before = base.reindex(snapshot.index)
+        changed = (before["Etag"] != snapshot["Etag"]).fillna(True)
+        fetched = int((changed | before["Error"].notna()).sum())
+    else:
+        snapshot = service.build_project_snapshot(syn, args.workers)
+        fetched = len(snapshot)
+    if snapshot.empty:
+        sys.exit("No projects found in the Project View.")
+
+    write_export(export_frame(snapshot, keys), args.output, fmt)
+    failed = int(snapshot["Error"].notna().sum())
+    print(
+        f"Exported {len(snapshot)} projects ({fetched} fetched, {failed} failed) "
+        f"to {args.output} in {time.perf_counter() - start:.1f}s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Deferred imports for Synapse Wiki Annotator's heavy dependencies."""
+
+import importlib
+import importlib.util
+import sys
+import threading
+import types
+
+
+class _LazyModule(types.ModuleType):
+    """Stand-in for a module that imports it when an attribute is first read."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._lock = threading.Lock()
+        self._module = None
+
+    def __getattr__(self, attr):
+        # Only reached for attributes the stand-in doesn't have itself
+        module = self._module
+        if module is None:
+            # Sessions, the snapshot refresher and the wiki prefetcher run in
+            # their own threads; all but the first wait for the import
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self.__name__)
+                module = self._module
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """
+    Return module `name`, deferring its import until an attribute is first used.
+
+    Lets modules keep `pd.DataFrame`-style references to pandas and
+    synapseclient without paying for the import before the page first renders.
+    A module that is already imported is returned as is. The import itself
+    happens once, under a lock, so any thread may be the first to use it.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    return _LazyModule(name)
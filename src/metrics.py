@@ -0,0 +1,281 @@
+"""Latency and cache instrumentation for Synapse Wiki Annotator."""
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SAMPLE_SIZE = 1000  # Recent latencies kept per operation for percentiles
+
+# Where to export metrics (".prom" for Prometheus text, anything else for JSON)
+METRICS_FILE = os.environ.get("CHALLENGE_DASHBOARD_METRICS_FILE")
+METRICS_EXPORT_INTERVAL = 15  # Seconds between exports to METRICS_FILE
+
+
+def _percentile(sorted_values, fraction):
+    """Return the value below which `fraction` of the sorted values fall."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+class Metrics:
+    """
+    A thread-safe registry of per-operation latencies and per-cache hit counts.
+
+    Every operation keeps cumulative counts and histogram buckets for export,
+    plus its most recent `SAMPLE_SIZE` latencies for percentiles.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = {}
+        self._caches = {}
+        self.started_at = time.time()
+
+    def observe(self, name, seconds, error=False):
+        """Record one call to `name` that took `seconds`."""
+        with self._lock:
+            op = self._operations.get(name)
+            if op is None:
+                op = self._operations[name] = {
+                    "calls": 0,
+                    "errors": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "first": seconds,
+                    "buckets": [0] * len(LATENCY_BUCKETS),
+                    "samples": deque(maxlen=SAMPLE_SIZE),
+                }
+            op["calls"] += 1
+            op["errors"] += bool(error)
+            op["total"] += seconds
+            op["max"] = max(op["max"], seconds)
+            op["samples"].append(seconds)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    op["buckets"][i] += 1
+                    break
+
+    def record_cache(self, name, hit):
+        """Record a hit or a miss on the cache called `name`."""
+        with self._lock:
+            counts = self._caches.setdefault(name, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+
+    @contextmanager
+    def timed(self, name):
+        """Time the enclosed block as one call to `name`, counting raised errors."""
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, error)
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        with self._lock:
+            self._operations.clear()
+            self._caches.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """
+        Summarize what has been recorded.
+
+        Returns:
+            dict: `operations`, mapping each name to its calls, errors and
+            latency statistics in seconds (`first` being the first recorded
+            latency, such as a cold start), and `caches`, mapping each cache to
+            its hits, misses and hit ratio.
+        """
+        with self._lock:
+            operations = {
+                name: (dict(op), sorted(op["samples"]))
+                for name, op in self._operations.items()
+            }
+            caches = {name: dict(counts) for name, counts in self._caches.items()}
+            started_at = self.started_at
+
+        summary = {"started_at": started_at, "operations": {}, "caches": {}}
+        for name, (op, samples) in sorted(operations.items()):
+            summary["operations"][name] = {
+                "calls": op["calls"],
+                "errors": op["errors"],
+                "mean": op["total"] / op["calls"],
+                "p50": _percentile(samples, 0.5),
+                "p95": _percentile(samples, 0.95),
+                "p99": _percentile(samples, 0.99),
+                "max": op["max"],
+                "first": op["first"],
+            }
+        for name, counts in sorted(caches.items()):
+            lookups = counts["hits"] + counts["misses"]
+            summary["caches"][name] = {
+                **counts,
+                "hit_ratio": counts["hits"] / lookups if lookups else None,
+            }
+        return summary
+
+    def to_prometheus(self):
+        """Render the recorded metrics in the Prometheus text exposition format."""
+        with self._lock:
+            operations = {
+                name: (op["calls"], op["errors"], op["total"], list(op["buckets"]))
+                for name, op in self._operations.items()
+            }
+            caches = {name: dict(counts) for name, counts in self._caches.items()}
+
+        def sample(metric, value, **labels):
+            label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+            return f"annotator_{metric}{{{label_text}}} {value}"
+
+        lines = [
+            "# HELP annotator_operation_seconds Latency of service and Synapse calls.",
+            "# TYPE annotator_operation_seconds histogram",
+        ]
+        for name, (calls, _, total, buckets) in sorted(operations.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, buckets):
+                cumulative += count
+                lines.append(
+                    sample(
+                        "operation_seconds_bucket", cumulative, operation=name, le=bound
+                    )
+                )
+            lines.append(
+                sample("operation_seconds_bucket", calls, operation=name, le="+Inf")
+            )
+            lines.append(sample("operation_seconds_sum", total, operation=name))
+            lines.append(sample("operation_seconds_count", calls, operation=name))
+
+        lines += [
+            "# HELP annotator_operation_errors_total Calls that raised an exception.",
+            "# TYPE annotator_operation_errors_total counter",
+        ]
+        for name, (_, errors, _, _) in sorted(operations.items()):
+            lines.append(sample("operation_errors_total", errors, operation=name))
+
+        lines += [
+            "# HELP annotator_cache_lookups_total Cache lookups by result.",
+            "# TYPE annotator_cache_lookups_total counter",
+        ]
+        for name, counts in sorted(caches.items()):
+            lines.append(
+                sample("cache_lookups_total", counts["hits"], cache=name, result="hit")
+            )
+            lines.append(
+                sample(
+                    "cache_lookups_total", counts["misses"], cache=name, result="miss"
+                )
+            )
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Write the metrics to `path`: Prometheus text for ".prom" files, else JSON."""
+        if path.endswith(".prom"):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=2)
+        # Write then rename, so scrapers never read a half-written file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+metrics = Metrics()
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def start_exporter(path=METRICS_FILE, interval=METRICS_EXPORT_INTERVAL):
+    """Export the metrics to `path` every `interval` seconds, once per process."""
+    global _exporter
+    if not path:
+        return
+    with _exporter_lock:
+        if _exporter is not None:
+            return
+
+        def export_forever():
+            while True:
+                time.sleep(interval)
+                try:
+                    metrics.export(path)
+                except OSError:
+                    pass
+
+        _exporter = threading.Thread(target=export_forever, daemon=True)
+        _exporter.start()
+
+
+def instrument(func, name):
+    """Wrap `func` so that every call is timed as the operation `name`."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with metrics.timed(name):
+            return func(*args, **kwargs)
+
+    # Keep .clear() of st.cache_data and st.cache_resource functions reachable
+    if hasattr(func, "clear"):
+        wrapper.clear = func.clear
+    return wrapper
+
+
+def instrument_module(module, prefix, include):
+    """
+    Time the public functions defined in `module` whose names start with `include`.
+
+    Functions are replaced in the module's namespace, so callers that look
+    them up through the module, and calls from one function to another, go
+    through the timing wrapper.
+
+    Args:
+        include (tuple[str]): Name prefixes of the functions to time.
+    """
+    for attr, value in list(vars(module).items()):
+        func = inspect.unwrap(value) if callable(value) else None
+        if (
+            inspect.isfunction(func)
+            and func.__module__ == module.__name__
+            and attr.startswith(include)
+        ):
+            setattr(module, attr, instrument(value, f"{prefix}.{attr}"))
+
+
+class InstrumentedClient:
+    """
+    A proxy around a Synapse client that times every method call.
+
+    Calls are recorded as "syn.<method>". Attributes that are not methods are
+    passed through untouched, even when they are callable, like `credentials`.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, attr):
+        value = getattr(self._client, attr)
+        if not inspect.ismethod(value) or attr.startswith("_"):
+            return value
+        return instrument(value, f"syn.{attr}")
+
+    def __setattr__(self, attr, value):
+        if attr == "_client":
+            object.__setattr__(self, attr, value)
+        else:
+            setattr(self._client, attr, value)
@@ -0,0 +1,252 @@
+"""Rate limiting and retries for every Synapse request made by Synapse Wiki Annotator."""
+
+import email.utils
+import inspect
+import random
+import threading
+import time
+
+import requests
+
+from src.metrics import metrics
+
+MAX_CONCURRENT_REQUESTS = 16  # Synapse requests in flight at once, across sessions
+REQUESTS_PER_SECOND = 50.0  # Sustained request rate, across sessions
+REQUEST_BURST = 100  # Requests that may be sent at once after a quiet period
+MAX_RETRIES = 4  # Extra attempts for a throttled or failed request
+BACKOFF_BASE = 0.5  # Seconds; the backoff cap doubles with every attempt
+BACKOFF_MAX = 30.0  # Longest wait between two attempts, unless Retry-After says more
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class SynapseRequestError(Exception):
+    """
+    A Synapse request that failed for good.
+
+    `kind` tells the UI what went wrong without parsing messages, and
+    `status_code` and `response` carry the HTTP details, if there were any.
+    """
+
+    kind = "error"
+
+    def __init__(self, message, status_code=None, response=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+
+class AccessDenied(SynapseRequestError):
+    """The user is not signed in or lacks access to the entity (401/403)."""
+
+    kind = "no_access"
+
+
+class NotFound(SynapseRequestError):
+    """The entity does not exist (404)."""
+
+    kind = "not_found"
+
+
+class Throttled(SynapseRequestError):
+    """Synapse kept refusing the request as over its rate limit (429/503)."""
+
+    kind = "throttled"
+
+
+def _status_code(error):
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _retry_after(error):
+    """Return the seconds a Retry-After header asks us to wait, if there is one."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at - time.time())
+
+
+def classify(error):
+    """Wrap an error raised by the Synapse client in the matching typed error."""
+    if isinstance(error, SynapseRequestError):
+        return error
+    status = _status_code(error)
+    if status in (401, 403):
+        error_type = AccessDenied
+    elif status == 404:
+        error_type = NotFound
+    elif status in (429, 503):
+        error_type = Throttled
+    else:
+        error_type = SynapseRequestError
+    message = str(error) or type(error).__name__
+    return error_type(message, status, getattr(error, "response", None))
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket allowing `rate` acquisitions per second on average.
+
+    Up to `burst` tokens accumulate while the bucket is idle. A `rate` of None
+    never waits.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, waiting for it if the bucket is empty."""
+        if self.rate is None:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RequestScheduler:
+    """
+    Run Synapse requests under one concurrency budget and one rate limit.
+
+    Requests that fail with a throttling or server error, or with a network
+    error, are retried with jittered exponential backoff. A Retry-After header
+    pauses every request, not just the one that received it, since the limit
+    applies to all of them. Errors that outlast the retries are raised as
+    `SynapseRequestError` subclasses.
+    """
+
+    def __init__(
+        self,
+        max_concurrency=MAX_CONCURRENT_REQUESTS,
+        rate=REQUESTS_PER_SECOND,
+        burst=REQUEST_BURST,
+        max_retries=MAX_RETRIES,
+        backoff_base=BACKOFF_BASE,
+        backoff_max=BACKOFF_MAX,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(rate, burst)
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+    def _wait_for_turn(self):
+        while True:
+            with self._lock:
+                pause = self._paused_until - time.monotonic()
+            if pause <= 0:
+                break
+            time.sleep(pause)
+        self._bucket.acquire()
+
+    def _pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _backoff(self, attempt):
+        """Full jitter: a random wait up to a cap that doubles every attempt."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def call(self, func, *args, **kwargs):
+        """Call `func` under the budget, retrying transient failures."""
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            self._wait_for_turn()
+            with self._slots:
+                metrics.observe("scheduler.wait", time.perf_counter() - start)
+                try:
+                    return func(*args, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error, retry_after = e, None
+                except Exception as e:
+                    if _status_code(e) not in RETRYABLE_STATUS:
+                        raise classify(e) from e
+                    error, retry_after = e, _retry_after(e)
+
+            if attempt == self.max_retries:
+                raise classify(error) from error
+            if retry_after is not None:
+                self._pause(retry_after)
+            delay = self._backoff(attempt)
+            metrics.observe("scheduler.backoff", delay)
+            time.sleep(delay)
+
+
+scheduler = RequestScheduler()
+
+
+def disable_client_retries(client):
+    """
+    Make a Synapse client send each request once, leaving retries to the scheduler.
+
+    The client otherwise retries throttled and failed requests itself, up to 60
+    times over about half an hour and ignoring Retry-After, all while holding
+    one of the scheduler's slots. Every request it sends goes through
+    `_build_retry_policy`, so that is where the retries are turned off.
+    """
+    build_retry_policy = getattr(client, "_build_retry_policy", None)
+    if build_retry_policy is None:
+        return
+
+    def single_attempt(retryPolicy=None):
+        return {**build_retry_policy(retryPolicy or {}), "retries": 0}
+
+    client._build_retry_policy = single_attempt
+
+
+def _materialized(func, *args, **kwargs):
+    """Call `func`, reading a generator it returns to the end within the call."""
+    result = func(*args, **kwargs)
+    return list(result) if inspect.isgenerator(result) else result
+
+
+class ScheduledClient:
+    """
+    A proxy around a Synapse client that sends every method call through `scheduler`.
+
+    Methods that return generators, like `getTableColumns`, return lists
+    instead, so that the requests made while iterating are scheduled too.
+    Attributes that are not methods, such as `credentials`, are passed
+    through untouched.
+    """
+
+    def __init__(self, client, request_scheduler=None):
+        object.__setattr__(self, "_client", client)
+        object.__setattr__(self, "_scheduler", request_scheduler or scheduler)
+
+    def __getattr__(self, attr):
+        value = getattr(self._client, attr)
+        # Methods of a wrapped proxy are functions that wrap a bound method
+        if not inspect.ismethod(inspect.unwrap(value)) or attr.startswith("_"):
+            return value
+
+        def scheduled(*args, **kwargs):
+            return self._scheduler.call(_materialized, value, *args, **kwargs)
+
+        return scheduled
+
+    def __setattr__(self, attr, value):
+        setattr(self._client, attr, value)
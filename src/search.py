@@ -0,0 +1,181 @@
+"""Project search for Synapse Wiki Annotator."""
+
+import bisect
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+FUZZY_THRESHOLD = 0.5  # Share of a query token's trigrams a fuzzy match must contain
+
+
+def normalize(text):
+    """Lowercase `text` and strip accents and punctuation."""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+def tokenize(text):
+    """Split `text` into normalized search tokens."""
+    return normalize(text).split()
+
+
+def trigrams(token):
+    """Return the set of three-character substrings of a token."""
+    return {token[i : i + 3] for i in range(len(token) - 2)}
+
+
+class ProjectSearchIndex:
+    """
+    An in-memory search index over project names, IDs and annotation values.
+
+    Every query token must match each returned project, either as a prefix of
+    one of its tokens, as a substring, or, when nothing matches literally,
+    approximately (sharing most of its trigrams). Results are ranked by how
+    closely they matched. The index is updated in place when the snapshot
+    changes, re-indexing only the projects whose etag differs.
+    """
+
+    def __init__(self, projects=None):
+        self._lock = threading.RLock()
+        self._docs = {}  # project ID -> (etag, tokens)
+        self._postings = defaultdict(set)  # token -> project IDs
+        self._trigrams = defaultdict(set)  # trigram -> tokens
+        self._sorted_tokens = []
+        if projects is not None:
+            self.update(projects)
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def _project_tokens(project_id, name, annotations):
+        text = [name, project_id, *(annotations or {}).values()]
+        return {token for value in text for token in tokenize(value)}
+
+    def update(self, projects):
+        """
+        Bring the index in line with a new snapshot.
+
+        Args:
+            projects (pd.DataFrame): The project snapshot, with `Project ID`,
+                `Project Name`, `Etag` and `Annotations` columns.
+        """
+        projects = {
+            project_id: (etag, name, annotations)
+            for project_id, etag, name, annotations in zip(
+                projects["Project ID"],
+                projects["Etag"],
+                projects["Project Name"],
+                projects["Annotations"],
+            )
+        }
+        with self._lock:
+            for project_id in list(self._docs):
+                current = projects.get(project_id)
+                if current is None or current[0] != self._docs[project_id][0]:
+                    self._remove(project_id)
+            new_tokens = set()
+            for project_id, (etag, name, annotations) in projects.items():
+                if project_id not in self._docs:
+                    new_tokens |= self._add(project_id, etag, name, annotations)
+            if len(new_tokens) > 100:
+                self._sorted_tokens = sorted(self._postings)
+            else:
+                for token in new_tokens:
+                    bisect.insort(self._sorted_tokens, token)
+
+    def _add(self, project_id, etag, name, annotations):
+        """Index one project, returning the tokens the index had not seen before."""
+        tokens = self._project_tokens(project_id, name, annotations)
+        self._docs[project_id] = (etag, tokens)
+        new_tokens = set()
+        for token in tokens:
+            if token not in self._postings:
+                new_tokens.add(token)
+                for gram in trigrams(token):
+                    self._trigrams[gram].add(token)
+            self._postings[token].add(project_id)
+        return new_tokens
+
+    def _remove(self, project_id):
+        _, tokens = self._docs.pop(project_id)
+        for token in tokens:
+            postings = self._postings[token]
+            postings.discard(project_id)
+            if not postings:
+                del self._postings[token]
+                for gram in trigrams(token):
+                    self._trigrams[gram].discard(token)
+                # Keep the sorted token list in step without a full re-sort
+                i = bisect.bisect_left(self._sorted_tokens, token)
+                if i < len(self._sorted_tokens) and self._sorted_tokens[i] == token:
+                    del self._sorted_tokens[i]
+
+    def _match_token(self, query_token):
+        """Score the index tokens that match one query token."""
+        scores = {}
+        if query_token in self._postings:
+            scores[query_token] = 3.0
+
+        # Prefix matches form a contiguous run of the sorted token list
+        i = bisect.bisect_left(self._sorted_tokens, query_token)
+        while i < len(self._sorted_tokens) and self._sorted_tokens[i].startswith(
+            query_token
+        ):
+            scores.setdefault(self._sorted_tokens[i], 2.0)
+            i += 1
+
+        grams = trigrams(query_token)
+        if not grams:
+            return scores
+        # Substring matches contain every trigram; intersect the rarest first
+        postings = sorted((self._trigrams.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        for token in candidates:
+            if token not in scores and query_token in token:
+                scores[token] = 1.5
+
+        # Fall back to fuzzy matches only when nothing matched literally
+        if not scores:
+            counts = defaultdict(int)
+            for gram in grams:
+                for token in self._trigrams.get(gram, ()):
+                    counts[token] += 1
+            for token, count in counts.items():
+                if count / len(grams) >= FUZZY_THRESHOLD:
+                    scores[token] = count / len(grams)
+        return scores
+
+    def search(self, query):
+        """
+        Find the projects matching `query`.
+
+        Returns:
+            list[str]: Matching project IDs, best match first.
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+
+        with self._lock:
+            totals = None
+            for query_token in query_tokens:
+                project_scores = defaultdict(float)
+                for token, score in self._match_token(query_token).items():
+                    for project_id in self._postings[token]:
+                        project_scores[project_id] = max(
+                            project_scores[project_id], score
+                        )
+                if totals is None:
+                    totals = dict(project_scores)
+                else:
+                    totals = {
+                        project_id: totals[project_id] + score
+                        for project_id, score in project_scores.items()
+                        if project_id in totals
+                    }
+                if not totals:
+                    return []
+
+        return sorted(totals, key=totals.get, reverse=True)
@@ -1,17 +1,130 @@
+import datetime
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
 import streamlit as st
-import synapseclient
-import pandas as pd
+
+from src.cache import DiskCache, SingleFlight, TTLCache
+from src.lazy import lazy_import
+from src.metrics import InstrumentedClient, instrument_module
+from src.scheduler import (
+    AccessDenied,
+    ScheduledClient,
+    Throttled,
+    disable_client_retries,
+)
+from src.search import ProjectSearchIndex
+from src.wiki_tree import WikiTree
+
+# Imported on first use, so that the page can render before they are loaded
+pd = lazy_import("pandas")
+synapseclient = lazy_import("synapseclient")
 
 # Constants
 TABLE_ID = "syn51476218"
 EXCLUDED_SCHEMA_KEYS = ["id", "createdBy", "modifiedBy", "name", "etag"]
+SORT_OPTIONS = ["Editable First", "Name (A-Z)", "Name (Z-A)", "Has Annotations"]
+BEST_MATCH = "Best Match"  # Sort option offered while searching: search rank order
+MAX_WORKERS = 8  # Concurrent Synapse requests for bulk lookups
+REQUEST_TIMEOUT = 30  # Seconds allowed for a single Synapse request
+VIEW_STALE_SECONDS = 600  # How long an edited project's view row is distrusted
+
+# Persistent cache, shared by restarts and by replicas that mount the same volume
+CACHE_DIR = os.environ.get("CHALLENGE_DASHBOARD_CACHE_DIR", ".cache")
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+PROJECT_LIST_TTL = 600
+VIEW_SCHEMA_TTL = 3600
+ANNOTATIONS_TTL = 600
+PERMISSIONS_TTL = 300
+SNAPSHOT_TTL = 7 * 24 * 3600  # Base snapshot for incremental refreshes
+SNAPSHOT_MAX_AGE = 300  # Snapshots older than this are refreshed in the background
+SNAPSHOT_RETRY_DELAY = 60  # Seconds before a failed background refresh is retried
+PERMISSION_CACHE_SIZE = 5000  # Entity permissions kept in memory, across users
+ANNOTATION_CACHE_SIZE = 2000  # Entity annotations kept in memory
+ANNOTATION_WRITE_RETRIES = 3  # Attempts when an annotation write hits an etag conflict
+WIKI_CACHE_BYTES = 64 * 1024 * 1024  # Wiki markdown kept in memory
+WIKI_ETAG_TTL = 60  # Seconds before a cached wiki page's etag is checked again
+WIKI_HEADERS_TTL = 300
+WIKI_PREFETCH_WORKERS = 4
+CHILDREN_PAGE_TTL = 300  # Seconds a page of a folder listing is reused
+FOLDER_SUMMARY_TTL = 3600  # Bounds staleness, as a folder's etag ignores its contents
+TABLE_PREVIEW_TTL = 600  # Bounds staleness, as a view's etag ignores the rows it shows
+TABLE_PAGE_SIZE = 50  # Rows fetched per table preview query
+TABLE_CACHE_BYTES = 128 * 1024 * 1024  # Table preview rows kept in memory
+
+# Synapse lookups in flight, shared by every session so identical ones run once
+_in_flight = SingleFlight(name="in_flight")
+
+# Projects edited by this process, mapped to when they were edited
+_stale_projects = {}
+_stale_lock = threading.Lock()
+
+# Permissions keyed by (user, entity ID), shared by every session in this process
+_permission_cache = TTLCache(
+    maxsize=PERMISSION_CACHE_SIZE, ttl=PERMISSIONS_TTL, name="permissions"
+)
+
+# Annotations in the Synapse REST format (with etag), keyed by entity ID
+_annotation_cache = TTLCache(
+    maxsize=ANNOTATION_CACHE_SIZE, ttl=ANNOTATIONS_TTL, name="annotations"
+)
+
+# Wiki pages keyed by (owner, wiki ID, etag), bounded by the size of their markdown,
+# and the last known etag of each (owner, wiki ID) with when it was checked
+_wiki_cache = TTLCache(
+    maxsize=10000,
+    ttl=float("inf"),
+    max_bytes=WIKI_CACHE_BYTES,
+    sizeof=lambda wiki: len(wiki.markdown or ""),
+    name="wiki_pages",
+)
+_wiki_etags = TTLCache(maxsize=10000, ttl=float("inf"), name="wiki_etags")
+_wiki_headers = TTLCache(maxsize=1000, ttl=WIKI_HEADERS_TTL, name="wiki_headers")
+_wiki_trees = TTLCache(maxsize=1000, ttl=WIKI_HEADERS_TTL, name="wiki_trees")
+_wiki_prefetcher = ThreadPoolExecutor(max_workers=WIKI_PREFETCH_WORKERS)
+
+# Pages of child listings keyed by (parent ID, entity types, page token)
+_children_pages = TTLCache(maxsize=5000, ttl=CHILDREN_PAGE_TTL, name="folder_pages")
+
+# Subtree statistics keyed by (user, folder ID, folder etag)
+_folder_summaries = TTLCache(
+    maxsize=1000, ttl=FOLDER_SUMMARY_TTL, name="folder_summaries"
+)
+
+# Table schemas and row counts keyed by (user, table ID, etag), and pages of
+# rows keyed by (user, table ID, etag, offset), bounded by their memory use
+_table_previews = TTLCache(maxsize=1000, ttl=TABLE_PREVIEW_TTL, name="table_previews")
+_table_pages = TTLCache(
+    maxsize=10000,
+    ttl=TABLE_PREVIEW_TTL,
+    max_bytes=TABLE_CACHE_BYTES,
+    sizeof=lambda frame: int(frame.memory_usage(deep=True).sum()),
+    name="table_pages",
+)
+
+# Annotation coverage, keyed by user, with the snapshot it was computed from
+_coverage_cache = TTLCache(maxsize=100, ttl=SNAPSHOT_TTL, name="coverage")
 
 
 @st.cache_resource
 def get_synapse_client(token):
-    """Authenticate and return a Synapse client."""
+    """
+    Authenticate and return a Synapse client whose calls are timed.
+
+    Every call goes through the shared request scheduler, which rate limits
+    and retries it in place of the client's own retries; the timings are of
+    the individual attempts.
+    """
     try:
-        client = synapseclient.Synapse()
+        synapse = synapseclient.Synapse()
+        disable_client_retries(synapse)
+        client = ScheduledClient(InstrumentedClient(synapse))
         client.login(authToken=token)
         return client
     except Exception as e:
@@ -19,91 +132,1337 @@ def get_synapse_client(token):
         return None
 
 
-@st.cache_data(ttl=600)
-def fetch_project_list(_syn_client):
-    """Query the Project View for ID and Name."""
+@st.cache_resource
+def get_user_profile(token):
+    """
+    Return the profile of the user `token` belongs to, fetched once per token.
+
+    Kept next to the client so that reruns can show who is logged in without
+    asking Synapse again.
+    """
+    syn = get_synapse_client(token)
+    return None if syn is None else syn.getUserProfile()
+
+
+@st.cache_resource
+def get_disk_cache():
+    """Return the persistent cache stored under CACHE_DIR."""
+    return DiskCache(CACHE_DIR, max_bytes=CACHE_MAX_BYTES)
+
+
+def _user_key(syn_client):
+    """Identify the logged-in user for per-user cache entries."""
+    credentials = getattr(syn_client, "credentials", None)
+    return getattr(credentials, "owner_id", None) or "anonymous"
+
+
+def _freeze(value):
+    """Turn lists, sets and dicts into tuples so that `value` can be a dict key."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_freeze(item) for item in value))
+    return value
+
+
+def coalesced(func):
+    """
+    Run concurrent identical calls to a Synapse loader once.
+
+    Calls are identical when they are to the same function, with the same
+    arguments, for the same user. Callers that arrive while such a call is in
+    flight, from any session or thread, wait for it and share its result or
+    error. The loader's own caches take over once it returns.
+    """
+
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(syn_client, *args, **kwargs):
+        # Bind the arguments so that f(x) and f(x, timeout=30) share a key
+        bound = signature.bind(syn_client, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = list(bound.arguments.items())[1:]
+        key = (func.__name__, _user_key(syn_client), _freeze(arguments))
+        return _in_flight.do(key, func, syn_client, *args, **kwargs)
+
+    return wrapper
+
+
+def clear_project_cache():
+    """Forget cached project data so the next load fetches it from Synapse."""
+    fetch_project_list.clear()
+    _permission_cache.clear()
+    _annotation_cache.clear()
+    cache = get_disk_cache()
+    for prefix in ("project_list:", "annotations:", "permissions:", "snapshot:"):
+        cache.delete_prefix(prefix)
+
+
+@st.cache_data(ttl=PROJECT_LIST_TTL)
+def fetch_project_list(_syn_client, include_schema=False):
+    """
+    Query the Project View for ID, Name, etag and modification time.
+
+    With `include_schema`, the annotation columns from `fetch_view_schema` are
+    pulled in the same query so annotation status can be derived from the view.
+    """
+    cache = get_disk_cache()
+    cache_key = f"project_list:{TABLE_ID}:{include_schema}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    columns = ["id", "name", "etag", "modifiedOn"]
+    if include_schema:
+        columns += [f'"{key}"' for key in fetch_view_schema(_syn_client)]
     try:
-        query = _syn_client.tableQuery(f"SELECT id, name FROM {TABLE_ID}")
-        return query.asDataFrame()
+        query = _syn_client.tableQuery(f"SELECT {', '.join(columns)} FROM {TABLE_ID}")
+        projects_df = query.asDataFrame()
+        cache.set(cache_key, projects_df, ttl=PROJECT_LIST_TTL)
+        return projects_df
     except Exception as e:
         st.error(f"Error querying table: {e}")
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=3600)
-def fetch_view_schema(_syn_client):
-    """Fetch the column names defined in the Project View Schema, excluding system cols."""
+def annotation_flags(projects_df, keys):
+    """
+    Work out which annotation keys are filled in for each row of the Project View.
+
+    Args:
+        projects_df (pd.DataFrame): Result of `fetch_project_list(include_schema=True)`.
+        keys (list[str]): Annotation columns to check.
+
+    Returns:
+        tuple[pd.Series, pd.DataFrame]: A per-row "has annotations" flag and a
+        boolean mask with one column per key.
+    """
+    keys = [key for key in keys if key in projects_df.columns]
+    values = projects_df[keys].astype("string").fillna("")
+    # List columns come back as "[]" when empty
+    filled = values.apply(lambda col: ~col.str.strip().isin(["", "[]"]))
+    return filled.any(axis=1), filled
+
+
+def join_values(value):
+    """
+    Format an annotation value as it is kept in the project snapshot.
+
+    Multi-value annotations are joined with ", ", whether they come from an
+    entity as a list or from the Project View as a list or a JSON string.
+    """
+    if isinstance(value, str) and value.startswith("["):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value
+    if pd.api.types.is_list_like(value) and not isinstance(value, dict):
+        return ", ".join(map(str, value))
+    return value
+
+
+def normalize_annotations(annotations):
+    """Join the multi-value annotations of one snapshot row with `join_values`."""
+    return {key: join_values(value) for key, value in (annotations or {}).items()}
+
+
+def mark_stale(entity_id):
+    """Record that an entity's Project View row no longer reflects its annotations."""
+    with _stale_lock:
+        _stale_projects[entity_id] = time.monotonic()
+
+
+def stale_project_ids():
+    """Return the IDs of projects whose view row may still be out of date."""
+    cutoff = time.monotonic() - VIEW_STALE_SECONDS
+    with _stale_lock:
+        for entity_id, edited_at in list(_stale_projects.items()):
+            if edited_at < cutoff:
+                del _stale_projects[entity_id]
+        return set(_stale_projects)
+
+
+@st.cache_data(ttl=VIEW_SCHEMA_TTL)
+def _load_view_schema(_syn_client):
+    cache = get_disk_cache()
+    cache_key = f"view_schema:{TABLE_ID}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    columns = _syn_client.getTableColumns(TABLE_ID)
+    schema = [col.name for col in columns if col.name not in EXCLUDED_SCHEMA_KEYS]
+    cache.set(cache_key, schema, ttl=VIEW_SCHEMA_TTL)
+    return schema
+
+
+def fetch_view_schema(syn_client):
+    """
+    Fetch the column names defined in the Project View Schema, excluding system cols.
+
+    Errors give an empty schema, which is not cached, except for throttling,
+    which is raised as `Throttled`.
+    """
     try:
-        columns = _syn_client.getTableColumns(TABLE_ID)
-        return [col.name for col in columns if col.name not in EXCLUDED_SCHEMA_KEYS]
+        return _load_view_schema(syn_client)
+    except Throttled:
+        raise
     except Exception as e:
         st.error(f"Error fetching schema: {e}")
         return []
 
 
+@coalesced
+def fetch_permissions(syn_client, entity_id, timeout=REQUEST_TIMEOUT):
+    """
+    Fetch the logged-in user's permissions on an entity, from cache when possible.
+
+    Errors are raised rather than cached, so a failed check is retried next time.
+    """
+    user_key = _user_key(syn_client)
+    perms = _permission_cache.get((user_key, entity_id))
+    if perms is not None:
+        return perms
+
+    disk_key = f"permissions:{user_key}:{entity_id}"
+    perms = get_disk_cache().get(disk_key)
+    if perms is None:
+        perms = syn_client.restGET(f"/entity/{entity_id}/permissions", timeout=timeout)
+        get_disk_cache().set(disk_key, perms, ttl=PERMISSIONS_TTL)
+    _permission_cache.set((user_key, entity_id), perms)
+    return perms
+
+
+def invalidate_permissions(syn_client, entity_id=None):
+    """Forget the logged-in user's cached permissions on one entity, or on all of them."""
+    user_key = _user_key(syn_client)
+    if entity_id is None:
+        _permission_cache.delete_where(lambda key: key[0] == user_key)
+        get_disk_cache().delete_prefix(f"permissions:{user_key}:")
+    else:
+        _permission_cache.delete((user_key, entity_id))
+        get_disk_cache().delete(f"permissions:{user_key}:{entity_id}")
+
+
+@coalesced
+def fetch_raw_annotations(syn_client, entity_id, timeout=REQUEST_TIMEOUT):
+    """
+    Fetch an entity's annotations in the Synapse REST format, from cache when possible.
+
+    Errors are raised rather than cached.
+
+    Returns:
+        dict: The `/entity/{id}/annotations2` response, with `id`, `etag` and
+        typed `annotations`.
+    """
+    annos = _annotation_cache.get(entity_id)
+    if annos is not None:
+        return annos
+
+    disk_key = f"annotations:{entity_id}"
+    annos = get_disk_cache().get(disk_key)
+    if annos is None:
+        annos = syn_client.restGET(f"/entity/{entity_id}/annotations2", timeout=timeout)
+        get_disk_cache().set(disk_key, annos, ttl=ANNOTATIONS_TTL)
+    _annotation_cache.set(entity_id, annos)
+    return annos
+
+
+# Parse the string values of each Synapse annotation type
+_ANNOTATION_TYPES = {
+    "STRING": str,
+    "LONG": int,
+    "DOUBLE": float,
+    "BOOLEAN": lambda value: value.lower() == "true",
+    "TIMESTAMP_MS": lambda value: datetime.datetime.fromtimestamp(
+        int(value) / 1000, datetime.timezone.utc
+    ),
+}
+
+
+def _flat_annotations(raw_annotations):
+    """Turn annotations in the Synapse REST format into a dict of typed value lists."""
+    return {
+        key: [
+            _ANNOTATION_TYPES.get(anno["type"], str)(value) for value in anno["value"]
+        ]
+        for key, anno in raw_annotations["annotations"].items()
+    }
+
+
+def get_annotations(syn_client, entity_id):
+    """
+    Get an entity's annotations as a flat dictionary of value lists.
+
+    Served from the annotation cache, which `update_annotation` keeps current.
+    """
+    return _flat_annotations(fetch_raw_annotations(syn_client, entity_id))
+
+
+def cache_annotations(entity_id, raw_annotations):
+    """Replace an entity's cached annotations, e.g. after writing them."""
+    _annotation_cache.set(entity_id, raw_annotations)
+    get_disk_cache().set(
+        f"annotations:{entity_id}", raw_annotations, ttl=ANNOTATIONS_TTL
+    )
+
+
+def invalidate_annotations(entity_id):
+    """Forget an entity's cached annotations."""
+    _annotation_cache.delete(entity_id)
+    get_disk_cache().delete(f"annotations:{entity_id}")
+
+
 def can_edit_entity(syn_client, entity_id):
-    """Check if the user has EDIT permissions on an entity."""
+    """
+    Check if the user has EDIT permissions on an entity.
+
+    Errors count as no access, except for throttling, which is raised as
+    `Throttled` so that it is not mistaken for a missing permission.
+    """
     try:
-        perms = syn_client.restGET(f"/entity/{entity_id}/permissions")
+        perms = fetch_permissions(syn_client, entity_id)
         return perms.get("canEdit", False)
+    except Throttled:
+        raise
     except Exception:
         return False
 
 
+def fetch_project_status(
+    syn_client, project_id, timeout=REQUEST_TIMEOUT, check_annotations=True
+):
+    """
+    Fetch the annotation and edit-permission status of a single project.
+
+    Unlike `can_edit_entity`, errors are raised rather than mapped to False so
+    that callers can report them. Without `check_annotations`, only permissions
+    are fetched and `has_annotations` and `annotations` are None.
+    """
+    has_annotations = annotations = None
+    if check_annotations:
+        annos = _flat_annotations(
+            fetch_raw_annotations(syn_client, project_id, timeout)
+        )
+        annotations = {
+            key: join_values(values) for key, values in annos.items() if values
+        }
+        has_annotations = bool(annotations)
+
+    perms = fetch_permissions(syn_client, project_id, timeout)
+    return {
+        "has_annotations": has_annotations,
+        "annotations": annotations,
+        "can_edit": perms.get("canEdit", False),
+    }
+
+
+def fetch_projects_bulk(
+    syn_client,
+    project_ids,
+    max_workers=MAX_WORKERS,
+    timeout=REQUEST_TIMEOUT,
+    annotation_ids=None,
+):
+    """
+    Fetch annotation and permission status for many projects concurrently.
+
+    Lookups are spread over at most `max_workers` threads, and each Synapse
+    request is given `timeout` seconds. Projects that are still pending once
+    every request has had its share of time are reported as timed out.
+
+    Args:
+        annotation_ids (set[str] | None): Projects whose annotations should be
+            fetched as well as their permissions. Defaults to all of them.
+
+    Returns:
+        list[dict]: One entry per project, in the order of `project_ids`, with
+        keys `id`, `has_annotations`, `annotations` (non-empty values joined
+        into strings), `can_edit`, `error` and `error_kind`. `error` is None
+        on success; otherwise it describes the failure and both flags are
+        False. `error_kind` is the failure's `SynapseRequestError.kind`
+        ("no_access", "throttled", ...), or "timeout".
+        `has_annotations` and `annotations` are None for projects that were
+        not checked.
+    """
+    project_ids = list(project_ids)
+    if not project_ids:
+        return []
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    # The per-project cache writes are committed together once all are done
+    with get_disk_cache().batch() as cache_writes:
+        try:
+            futures = [
+                executor.submit(
+                    cache_writes.run,
+                    fetch_project_status,
+                    syn_client,
+                    project_id,
+                    timeout,
+                    annotation_ids is None or project_id in annotation_ids,
+                )
+                for project_id in project_ids
+            ]
+            # Each worker runs up to two requests back to back, so allow two
+            # request timeouts per round of work the pool has to get through.
+            rounds = -(-len(project_ids) // max_workers)
+            wait(futures, timeout=2 * timeout * rounds)
+        finally:
+            # Don't block on stragglers; their results are reported as timeouts.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    for project_id, future in zip(project_ids, futures):
+        result = {
+            "id": project_id,
+            "has_annotations": False,
+            "annotations": None,
+            "can_edit": False,
+            "error": None,
+            "error_kind": None,
+        }
+        if not future.done() or future.cancelled():
+            result["error"] = f"Timed out after {timeout}s"
+            result["error_kind"] = "timeout"
+        elif future.exception() is not None:
+            error = future.exception()
+            result["error"] = str(error) or type(error).__name__
+            result["error_kind"] = getattr(error, "kind", "error")
+        else:
+            result.update(future.result())
+        results.append(result)
+
+    return results
+
+
+# Ways a project lookup can fail, as reported in "Error Kind"
+ERROR_KINDS = ["no_access", "not_found", "throttled", "timeout", "error"]
+
+# Column types of the project snapshot; projects are rows
+SNAPSHOT_DTYPES = {
+    "Project Name": "string",
+    "Project ID": "string",
+    "Has Annotations": "bool",
+    "Annotations": "object",
+    "Can Edit": "bool",
+    "Error": "string",
+    "Error Kind": "category",  # One of ERROR_KINDS
+    "Etag": "string",
+    "Modified On": "object",
+    "Name Rank": "int32",  # Position in case-insensitive name order, for sorting
+}
+
+
+def snapshot_frame(rows=()):
+    """
+    Build a project snapshot from rows, or give an existing one the snapshot's column types.
+
+    The rows are indexed by project ID, and `Name Rank` is recomputed.
+
+    Args:
+        rows (pd.DataFrame | list[dict]): Snapshot rows with the columns of
+            `SNAPSHOT_DTYPES`; missing columns are left empty.
+    """
+    frame = pd.DataFrame(rows)
+    frame["Name Rank"] = (
+        frame.get("Project Name", pd.Series(dtype="string"))
+        .fillna("")
+        .str.lower()
+        .rank(method="first")
+    )
+    for column, dtype in SNAPSHOT_DTYPES.items():
+        if column not in frame:
+            frame[column] = None
+        if dtype == "bool":
+            frame[column] = frame[column].fillna(False)
+        elif dtype == "category":
+            dtype = pd.CategoricalDtype(ERROR_KINDS)
+        frame[column] = frame[column].astype(dtype)
+    frame = frame[list(SNAPSHOT_DTYPES)]
+    frame.index = pd.Index(frame["Project ID"], name=None)
+    return frame
+
+
+def _snapshot_row(project_id, name, etag, modified_on, status, annotations):
+    """Build one row of the project snapshot shown on the landing page."""
+    return {
+        "Project Name": name,
+        "Project ID": project_id,
+        "Has Annotations": bool(annotations),
+        "Annotations": annotations or {},
+        "Can Edit": status["can_edit"],
+        "Error": status["error"],
+        "Error Kind": status.get("error_kind"),
+        "Etag": etag,
+        "Modified On": modified_on,
+    }
+
+
+def build_project_snapshot(syn_client, max_workers=MAX_WORKERS):
+    """
+    Build the landing page snapshot of every project from scratch.
+
+    Annotation values come from the view itself; only projects edited since
+    the view may have last indexed them are checked one by one.
+
+    Returns:
+        pd.DataFrame: One row per project, typed as in `SNAPSHOT_DTYPES`.
+    """
+    projects_df = fetch_project_list(syn_client, include_schema=True)
+    if projects_df.empty:
+        return snapshot_frame()
+
+    _, filled = annotation_flags(projects_df, fetch_view_schema(syn_client))
+    view_values = (
+        projects_df[filled.columns]
+        .apply(lambda column: column.map(join_values))
+        .astype("string")
+        .where(filled)
+    )
+    statuses = fetch_projects_bulk(
+        syn_client,
+        projects_df["id"],
+        max_workers=max_workers,
+        annotation_ids=stale_project_ids(),
+    )
+    # A frame without columns has no records, so a view without annotation
+    # columns still needs one (empty) set of values per project
+    records = (
+        view_values.to_dict("records")
+        if len(view_values.columns)
+        else [{}] * len(projects_df)
+    )
+
+    annotations = [
+        (
+            {key: value for key, value in values.items() if pd.notna(value)}
+            if status["annotations"] is None
+            else status["annotations"]
+        )
+        for values, status in zip(records, statuses)
+    ]
+    return snapshot_frame(
+        {
+            "Project Name": projects_df["name"].to_numpy(),
+            "Project ID": projects_df["id"].to_numpy(),
+            "Has Annotations": [bool(annos) for annos in annotations],
+            "Annotations": annotations,
+            "Can Edit": [status["can_edit"] for status in statuses],
+            "Error": [status["error"] for status in statuses],
+            "Error Kind": [status["error_kind"] for status in statuses],
+            "Etag": projects_df["etag"].to_numpy(),
+            "Modified On": projects_df["modifiedOn"].to_numpy(),
+        }
+    )
+
+
+def refresh_project_snapshot(syn_client, snapshot, max_workers=MAX_WORKERS):
+    """
+    Bring a previous snapshot up to date with one query against the Project View.
+
+    Projects whose etag is unchanged are kept as they are. New projects, changed
+    projects and projects that failed to load last time have their annotations
+    and permissions fetched again, and projects no longer in the view are dropped.
+    """
+    try:
+        query = syn_client.tableQuery(
+            f"SELECT id, name, etag, modifiedOn FROM {TABLE_ID}"
+        )
+        current_df = query.asDataFrame()
+    except Exception as e:
+        st.error(f"Error querying table: {e}")
+        return snapshot
+
+    # The previous row of each current project, empty for new ones
+    previous = snapshot.reindex(current_df["id"].astype("string"))
+    changed = (
+        previous["Etag"].fillna("").to_numpy() != current_df["etag"].to_numpy()
+    ) | previous["Error"].notna().to_numpy()
+    changed_df = current_df[changed]
+
+    for project_id in changed_df["id"]:
+        invalidate_annotations(project_id)
+        invalidate_permissions(syn_client, project_id)
+    statuses = fetch_projects_bulk(
+        syn_client, changed_df["id"], max_workers=max_workers
+    )
+
+    fresh = snapshot_frame(
+        [
+            _snapshot_row(
+                row.id,
+                row.name,
+                row.etag,
+                row.modifiedOn,
+                status,
+                status["annotations"],
+            )
+            for row, status in zip(changed_df.itertuples(index=False), statuses)
+        ]
+    )
+    refreshed = pd.concat([previous[~changed], fresh])
+    return snapshot_frame(refreshed.loc[current_df["id"].astype("string")])
+
+
+def load_project_snapshot(syn_client):
+    """
+    Return the last saved project snapshot for this user.
+
+    Returns:
+        tuple[pd.DataFrame | None, float | None]: The snapshot and the time it
+        was saved, or (None, None) if there is none.
+    """
+    saved = get_disk_cache().get(f"snapshot:{_user_key(syn_client)}:{TABLE_ID}")
+    if saved is None:
+        return None, None
+    # Snapshots saved by older versions are lists of row dicts, and may hold
+    # multi-value annotations from the view as JSON
+    snapshot = snapshot_frame(saved["projects"])
+    snapshot["Annotations"] = snapshot["Annotations"].map(normalize_annotations)
+    return snapshot, saved["updated_at"]
+
+
+def save_project_snapshot(syn_client, snapshot, updated_at):
+    """Keep a project snapshot as the base for the next incremental refresh."""
+    get_disk_cache().set(
+        f"snapshot:{_user_key(syn_client)}:{TABLE_ID}",
+        {"projects": snapshot, "updated_at": updated_at},
+        ttl=SNAPSHOT_TTL,
+    )
+
+
+class ProjectSnapshotStore:
+    """
+    Serves the last good project snapshot while a newer one is built in the background.
+
+    One store is shared by every session of a user in this process, and at most
+    one refresh runs at a time. `index` is kept in step with the snapshot for
+    project search.
+    """
+
+    def __init__(self, max_age):
+        self.max_age = max_age
+        self.snapshot = None
+        self.updated_at = None
+        self.error = None
+        self.failed_at = None
+        self.index = ProjectSearchIndex()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def refreshing(self):
+        """Whether a refresh is running right now."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def age(self):
+        """Seconds since the current snapshot was built, or None."""
+        if self.updated_at is None:
+            return None
+        return time.time() - self.updated_at
+
+    def get(self, syn_client):
+        """
+        Return the current snapshot, starting a background refresh if it is too old.
+
+        Only blocks when there is no snapshot at all, neither in memory nor on disk.
+        """
+        if self.snapshot is None:
+            with self._lock:
+                if self.snapshot is None:
+                    snapshot, updated_at = load_project_snapshot(syn_client)
+                    if snapshot is not None:
+                        self._set_snapshot(snapshot, updated_at)
+        if self.snapshot is None:
+            self.refresh(syn_client, full=True)
+            self._thread.join()
+        elif self.age > self.max_age and not self._failed_recently():
+            self.refresh(syn_client)
+        return snapshot_frame() if self.snapshot is None else self.snapshot
+
+    def refresh(self, syn_client, full=False):
+        """
+        Start a background refresh unless one is already running.
+
+        Args:
+            full (bool): Rebuild the snapshot from scratch instead of
+                refreshing only the projects that changed.
+
+        Returns:
+            bool: Whether a new refresh was started.
+        """
+        with self._lock:
+            if self.refreshing:
+                return False
+            self._thread = threading.Thread(
+                target=self._refresh, args=(syn_client, full), daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def _refresh(self, syn_client, full):
+        previous = self.snapshot
+        try:
+            if full or previous is None or previous.empty:
+                snapshot = build_project_snapshot(syn_client)
+            else:
+                snapshot = refresh_project_snapshot(syn_client, previous)
+        except Exception as e:
+            self.error = f"Could not refresh projects: {e}"
+            self.failed_at = time.time()
+            return
+
+        if snapshot is previous or snapshot.empty:
+            self.error = "Could not refresh projects from the Project View."
+            self.failed_at = time.time()
+            return
+        updated_at = time.time()
+        save_project_snapshot(syn_client, snapshot, updated_at)
+        self._set_snapshot(snapshot, updated_at)
+        self.error = self.failed_at = None
+
+    def _failed_recently(self):
+        """Whether the last refresh failed less than SNAPSHOT_RETRY_DELAY ago."""
+        return (
+            self.failed_at is not None
+            and time.time() - self.failed_at < SNAPSHOT_RETRY_DELAY
+        )
+
+    def _set_snapshot(self, snapshot, updated_at):
+        # Index first so the search never lags behind the published snapshot
+        self.index.update(snapshot)
+        self.snapshot, self.updated_at = snapshot, updated_at
+
+
+@st.cache_resource
+def _get_project_store(user_key, table_id):
+    return ProjectSnapshotStore(max_age=SNAPSHOT_MAX_AGE)
+
+
+def get_project_store(syn_client):
+    """Return the process-wide project snapshot store for the logged-in user."""
+    return _get_project_store(_user_key(syn_client), TABLE_ID)
+
+
+def _split_values(values):
+    """Split annotation values into one row per individual value."""
+    values = values.dropna().astype(str).str.strip()
+    split = values[values != ""].str.split(", ").explode()
+    return split.dropna().astype(str).str.strip()
+
+
+def annotation_coverage(projects, keys):
+    """
+    Work out how well each annotation key is filled in across a project snapshot.
+
+    Returns:
+        dict: `summary`, a DataFrame with one row per key (`Key`, `Filled`,
+        `Missing`, `Fill Rate`); `values`, each key's value counts, with
+        multi-value annotations counted once per value; and `missing`, each
+        key's snapshot rows without a value.
+    """
+    values = pd.DataFrame(
+        list(projects["Annotations"]), index=projects.index, columns=keys
+    ).astype("string")
+    filled = values.notna() & ~values.apply(lambda col: col.str.strip()).isin(
+        ["", "[]"]
+    )
+    counts = filled.sum()
+    summary = pd.DataFrame(
+        {
+            "Key": keys,
+            "Filled": counts.to_numpy(),
+            "Missing": (len(projects) - counts).to_numpy(),
+            "Fill Rate": (counts / max(len(projects), 1)).to_numpy(),
+        }
+    )
+    return {
+        "summary": summary,
+        "values": {key: _split_values(values[key]).value_counts() for key in keys},
+        "missing": {key: projects[~filled[key]] for key in keys},
+    }
+
+
+def get_annotation_coverage(syn_client):
+    """Return `annotation_coverage` for the current project snapshot, computed once per snapshot."""
+    snapshot = get_project_store(syn_client).get(syn_client)
+    user_key = _user_key(syn_client)
+    cached = _coverage_cache.get(user_key)
+    if cached is not None and cached[0] is snapshot:
+        return cached[1]
+    coverage = annotation_coverage(snapshot, list(fetch_view_schema(syn_client)))
+    _coverage_cache.set(user_key, (snapshot, coverage))
+    return coverage
+
+
+def search_projects(projects, index, query):
+    """Return the snapshot rows matching `query` in `index`, or all rows without one."""
+    if not query:
+        return projects
+    # Keep the index's ranking, best match first
+    positions = projects.index.get_indexer(index.search(query))
+    return projects.iloc[positions[positions >= 0]]
+
+
+def editable_projects(projects):
+    """Return the snapshot rows of the projects the user can edit."""
+    return projects[projects["Can Edit"]]
+
+
+def sort_projects(projects, sort_by):
+    """Sort snapshot rows by one of SORT_OPTIONS, or keep their order for BEST_MATCH."""
+    if sort_by == "Editable First":
+        # Editable projects first, then by name
+        return projects.sort_values(["Can Edit", "Name Rank"], ascending=[False, True])
+    if sort_by == "Name (A-Z)":
+        return projects.sort_values("Name Rank")
+    if sort_by == "Name (Z-A)":
+        return projects.sort_values("Name Rank", ascending=False)
+    if sort_by == "Has Annotations":
+        # Projects with annotations first, then by name
+        return projects.sort_values(
+            ["Has Annotations", "Name Rank"], ascending=[False, True]
+        )
+    return projects
+
+
+@coalesced
 def fetch_wiki_headers(syn_client, project_id):
-    """Get the tree of wiki pages for a project."""
+    """
+    Get the tree of wiki pages for a project.
+
+    Errors give no pages, except for throttling, which is raised as `Throttled`.
+    """
+    headers = _wiki_headers.get(project_id)
+    if headers is not None:
+        return headers
     try:
         headers = syn_client.getWikiHeaders(project_id)
-        return headers
+    except Throttled:
+        raise
     except Exception:
         return []
+    _wiki_headers.set(project_id, headers)
+    return headers
+
+
+def get_wiki_tree(syn_client, project_id):
+    """Get a project's wiki pages as a tree, indexed once per header list."""
+    headers = fetch_wiki_headers(syn_client, project_id)
+    tree = _wiki_trees.get(project_id)
+    if tree is None or tree.headers is not headers:
+        tree = WikiTree(headers)
+        _wiki_trees.set(project_id, tree)
+    return tree
+
+
+@coalesced
+def load_wiki_page(syn_client, owner_id, wiki_id):
+    """
+    Load a wiki page, reusing the cached copy while its etag is unchanged.
+
+    The etag is re-checked with a small metadata request at most every
+    WIKI_ETAG_TTL seconds; the markdown is only downloaded again when the page
+    has changed. Errors are raised.
+    """
+    key = (owner_id, wiki_id)
+    known = _wiki_etags.get(key)
+    if known is not None and time.monotonic() - known[1] > WIKI_ETAG_TTL:
+        uri = f"/entity/{owner_id}/wiki2"
+        if wiki_id is not None:
+            uri += f"/{wiki_id}"
+        known = (syn_client.restGET(uri)["etag"], time.monotonic())
+        _wiki_etags.set(key, known)
+
+    wiki = None if known is None else _wiki_cache.get((*key, known[0]))
+    if wiki is None:
+        wiki = syn_client.getWiki(owner_id, subpageId=wiki_id)
+        _wiki_etags.set(key, (wiki.etag, time.monotonic()))
+        _wiki_cache.set((*key, wiki.etag), wiki)
+    return wiki
 
 
 def fetch_wiki_page(syn_client, project_id, wiki_id):
     """Fetch a specific wiki page content."""
     try:
-        return syn_client.getWiki(project_id, subpageId=wiki_id)
+        return load_wiki_page(syn_client, project_id, wiki_id)
     except Exception as e:
         st.error(f"Could not load wiki page: {e}")
         return None
 
 
-def fetch_project_folders(syn_client, project_id):
-    """Get a list of folders within the project."""
+def _prefetch_wiki_page(syn_client, owner_id, wiki_id):
+    try:
+        load_wiki_page(syn_client, owner_id, wiki_id)
+    except Exception:
+        # The page is fetched, and the error shown, when it is opened
+        pass
+
+
+def prefetch_wiki_pages(syn_client, project_id, headers):
+    """Load a project's wiki pages in the background so switching pages is instant."""
+    for header in headers:
+        _wiki_prefetcher.submit(
+            _prefetch_wiki_page, syn_client, project_id, header["id"]
+        )
+
+
+@coalesced
+def fetch_children_page(syn_client, parent_id, include_types, page_token=None):
+    """
+    Fetch one page of an entity's children, as Synapse pages them.
+
+    Pages are memoized, so expanding a folder again or loading the next page
+    only requests what has not been seen recently. Errors are raised.
+
+    Returns:
+        tuple[list[dict], str | None]: The children on the page and the token
+        of the next page, or None on the last page.
+    """
+    key = (parent_id, tuple(include_types), page_token)
+    page = _children_pages.get(key)
+    if page is None:
+        body = {
+            "parentId": parent_id,
+            "includeTypes": list(include_types),
+            "sortBy": "NAME",
+            "sortDirection": "ASC",
+        }
+        if page_token:
+            body["nextPageToken"] = page_token
+        response = syn_client.restPOST("/entity/children", body=json.dumps(body))
+        page = (response.get("page", []), response.get("nextPageToken"))
+        _children_pages.set(key, page)
+    return page
+
+
+def fetch_children(syn_client, parent_id, include_types, max_pages=1):
+    """
+    Fetch the first `max_pages` pages of an entity's children, or all of them if None.
+
+    Returns:
+        tuple[list[dict], bool]: The children fetched, and whether more remain.
+    """
+    children = []
+    page_token = None
+    pages = 0
+    while max_pages is None or pages < max_pages:
+        pages += 1
+        page, page_token = fetch_children_page(
+            syn_client, parent_id, include_types, page_token
+        )
+        children.extend(page)
+        if not page_token:
+            break
+    return children, bool(page_token)
+
+
+def fetch_project_folders(syn_client, project_id, max_pages=1):
+    """
+    Get the first `max_pages` pages of folders within the project.
+
+    Returns:
+        tuple[list[dict], bool]: The folders, and whether more remain.
+    """
     try:
-        # getChildren returns a generator; convert to list
-        return list(syn_client.getChildren(project_id, includeTypes=["folder"]))
+        return fetch_children(syn_client, project_id, ["folder"], max_pages)
     except Exception as e:
         st.warning(f"Could not fetch folders: {e}")
-        return []
+        return [], False
 
 
-def fetch_folder_contents(syn_client, folder_id):
-    """Get a list of files and sub-folders within a specific folder."""
+def fetch_folder_contents(syn_client, folder_id, max_pages=1):
+    """
+    Get the first `max_pages` pages of files and sub-folders within a folder.
+
+    Errors give an empty folder, except for throttling, which is raised as
+    `Throttled`.
+
+    Returns:
+        tuple[list[dict], bool]: The folder's children, and whether more remain.
+    """
     try:
-        return list(syn_client.getChildren(folder_id, includeTypes=["file", "folder"]))
+        return fetch_children(syn_client, folder_id, ["file", "folder"], max_pages)
+    except Throttled:
+        raise
     except Exception:
-        return []
+        return [], False
+
+
+def _tally_folder(syn_client, folder_id, timeout=REQUEST_TIMEOUT):
+    """
+    Tally the direct children of one folder.
+
+    Returns:
+        tuple[int, int, str | None, list[str]]: The number of files, their
+        total size in bytes, the latest modification time among the children,
+        and the IDs of the sub-folders.
+    """
+    files = 0
+    size = 0
+    last_modified = None
+    subfolders = []
+    page_token = None
+    while True:
+        body = {"parentId": folder_id, "includeTypes": ["file", "folder"]}
+        if page_token:
+            body["nextPageToken"] = page_token
+        else:
+            # Summed over every page, so only asked for once
+            body["includeSumFileSizes"] = True
+        response = syn_client.restPOST(
+            "/entity/children", body=json.dumps(body), timeout=timeout
+        )
+        if not page_token:
+            size = response.get("sumFileSizesBytes") or 0
+        for child in response.get("page", []):
+            if "Folder" in child.get("type", ""):
+                subfolders.append(child["id"])
+            else:
+                files += 1
+            modified_on = child.get("modifiedOn")
+            if modified_on and (last_modified is None or modified_on > last_modified):
+                last_modified = modified_on
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return files, size, last_modified, subfolders
+
+
+@coalesced
+def summarize_folder(
+    syn_client, folder_id, max_workers=MAX_WORKERS, timeout=REQUEST_TIMEOUT
+):
+    """
+    Aggregate file counts, sizes and modification times over a folder's subtree.
+
+    Sub-folders are listed concurrently, at most `max_workers` at a time. The
+    result is cached per folder etag. Errors are raised rather than cached.
+
+    Returns:
+        dict: `files`, `folders` and `bytes` in the subtree, the latest
+        `last_modified` time, and the `depth` of the deepest sub-folder.
+    """
+    etag = syn_client.restGET(f"/entity/{folder_id}", timeout=timeout)["etag"]
+    key = (_user_key(syn_client), folder_id, etag)
+    summary = _folder_summaries.get(key)
+    if summary is not None:
+        return summary
+
+    summary = {"files": 0, "folders": 0, "bytes": 0, "last_modified": None, "depth": 0}
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pending = {executor.submit(_tally_folder, syn_client, folder_id, timeout): 0}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                depth = pending.pop(future)
+                files, size, last_modified, subfolders = future.result()
+                summary["files"] += files
+                summary["bytes"] += size
+                summary["folders"] += len(subfolders)
+                summary["depth"] = max(summary["depth"], depth)
+                if last_modified and (
+                    summary["last_modified"] is None
+                    or last_modified > summary["last_modified"]
+                ):
+                    summary["last_modified"] = last_modified
+                for subfolder_id in subfolders:
+                    child = executor.submit(
+                        _tally_folder, syn_client, subfolder_id, timeout
+                    )
+                    pending[child] = depth + 1
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    _folder_summaries.set(key, summary)
+    return summary
+
+
+def fetch_folder_summary(syn_client, folder_id):
+    """Summarize a folder's subtree, showing an error and returning None on failure."""
+    try:
+        return summarize_folder(syn_client, folder_id)
+    except Exception as e:
+        st.error(f"Could not summarize folder: {e}")
+        return None
 
 
 def fetch_project_tables(syn_client, project_id):
     """Get a list of tables and views within the project."""
     try:
-        return list(
-            syn_client.getChildren(project_id, includeTypes=["table", "entityview"])
+        tables, _ = fetch_children(
+            syn_client, project_id, ["table", "entityview"], max_pages=None
         )
+        return tables
     except Exception as e:
         st.warning(f"Could not fetch tables: {e}")
         return []
 
 
+@coalesced
+def load_table_preview(syn_client, table_id, timeout=REQUEST_TIMEOUT):
+    """
+    Load a table's etag, column schema and row count, cached per table etag.
+
+    The row count is computed by Synapse, so no rows are downloaded. Errors
+    are raised rather than cached.
+
+    Returns:
+        dict: The table's `etag`, its `columns` (name, type and maximum size
+        of each) and its `row_count`.
+    """
+    etag = syn_client.restGET(f"/entity/{table_id}", timeout=timeout)["etag"]
+    key = (_user_key(syn_client), table_id, etag)
+    preview = _table_previews.get(key)
+    if preview is not None:
+        return preview
+
+    columns = [
+        {
+            "Name": column.get("name"),
+            "Type": column.get("columnType"),
+            "Max Size": column.get("maxSize"),
+        }
+        for column in syn_client.getTableColumns(table_id)
+    ]
+    result = syn_client.tableQuery(
+        f"SELECT COUNT(*) FROM {table_id}", resultsAs="rowset"
+    )
+    row_count = int(result.rowset["rows"][0]["values"][0])
+    preview = {"etag": etag, "columns": columns, "row_count": row_count}
+    _table_previews.set(key, preview)
+    return preview
+
+
+@coalesced
+def load_table_rows(syn_client, table_id, etag, max_pages=1, page_size=TABLE_PAGE_SIZE):
+    """
+    Load the first `max_pages` pages of a table's rows into one DataFrame.
+
+    Each page is fetched with its own LIMIT/OFFSET query and cached per table
+    etag, so loading more rows only queries the pages not seen yet. Errors are
+    raised rather than cached.
+    """
+    user_key = _user_key(syn_client)
+    frames = []
+    for page in range(max_pages):
+        offset = page * page_size
+        key = (user_key, table_id, etag, offset, page_size)
+        frame = _table_pages.get(key)
+        if frame is None:
+            result = syn_client.tableQuery(
+                f"SELECT * FROM {table_id} LIMIT {page_size} OFFSET {offset}",
+                resultsAs="rowset",
+            )
+            frame = result.asDataFrame(rowIdAndVersionInIndex=False)
+            _table_pages.set(key, frame)
+        frames.append(frame)
+        if len(frame) < page_size:
+            break
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def fetch_table_preview(syn_client, table_id):
+    """Load a table's schema and row count, or show an error and return None."""
+    try:
+        return load_table_preview(syn_client, table_id)
+    except Exception as e:
+        st.error(f"Could not load table: {e}")
+        return None
+
+
+def fetch_table_rows(syn_client, table_id, etag, max_pages=1):
+    """Load a table's first rows, or show an error and return an empty DataFrame."""
+    try:
+        return load_table_rows(syn_client, table_id, etag, max_pages)
+    except Exception as e:
+        st.error(f"Could not load table rows: {e}")
+        return pd.DataFrame()
+
+
+def _status_code(error):
+    """Return the HTTP status code behind a Synapse error, if there is one."""
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _rest_annotation(values):
+    """
+    Build one annotation in the Synapse REST format from a list of values.
+
+    Bools, ints, floats, and dates or datetimes (naive ones taken as UTC) are
+    stored typed; anything else, or a mix, as strings. Returns None when no
+    values are left once empty ones are dropped.
+    """
+    values = [value for value in values if value is not None and value != ""]
+    if not values:
+        return None
+    if all(isinstance(value, bool) for value in values):
+        return {"type": "BOOLEAN", "value": [str(value).lower() for value in values]}
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        return {"type": "LONG", "value": [str(value) for value in values]}
+    if all(
+        isinstance(value, (int, float)) and not isinstance(value, bool)
+        for value in values
+    ):
+        return {"type": "DOUBLE", "value": [str(float(value)) for value in values]}
+    if all(isinstance(value, datetime.date) for value in values):
+        return {"type": "TIMESTAMP_MS", "value": [_epoch_ms(value) for value in values]}
+    return {"type": "STRING", "value": [str(value) for value in values]}
+
+
+def _epoch_ms(value):
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return str(round(value.timestamp() * 1000))
+
+
+def update_annotations(
+    syn_client, entity_id, changes, max_attempts=ANNOTATION_WRITE_RETRIES
+):
+    """
+    Set several annotations on an entity in a single write.
+
+    Writes only the entity's annotations, with one PUT guarded by the entity's
+    etag. If someone else changed the entity in the meantime, the annotations
+    are re-read and the write is retried, up to `max_attempts` times. Errors
+    are raised.
+
+    Args:
+        changes (dict): Annotation keys mapped to a single value or a list of
+            values. Types are kept, so ints, floats, bools and datetimes are
+            stored as typed annotations. An empty value removes the key.
+
+    Returns:
+        dict: The stored annotations in the Synapse REST format.
+    """
+    for attempt in range(max_attempts):
+        raw = fetch_raw_annotations(syn_client, entity_id)
+        # Keys not being changed are written back exactly as they were read
+        annotations = dict(raw["annotations"])
+        for key, value in changes.items():
+            annotation = _rest_annotation(
+                list(value) if isinstance(value, (list, tuple, set)) else [value]
+            )
+            if annotation is None:
+                annotations.pop(key, None)
+            else:
+                annotations[key] = annotation
+        body = {"id": raw["id"], "etag": raw["etag"], "annotations": annotations}
+        try:
+            stored = syn_client.restPUT(
+                f"/entity/{entity_id}/annotations2", body=json.dumps(body)
+            )
+            break
+        except Exception as e:
+            # 412 means our etag is out of date: re-read and try again
+            if _status_code(e) != 412 or attempt == max_attempts - 1:
+                raise
+            invalidate_annotations(entity_id)
+
+    mark_stale(entity_id)
+    cache_annotations(entity_id, stored)
+    return stored
+
+
 def update_annotation(syn_client, entity_id, key, value):
     """Update a specific annotation on an entity."""
     try:
-        entity = syn_client.get(entity_id)
-        # Synapse annotations are lists, so we wrap the value in a list
-        entity.annotations[key] = [value]
-        syn_client.store(entity)
+        update_annotations(syn_client, entity_id, {key: value})
         return True, f"✅ Successfully added annotation **{key}** to **{entity_id}**!"
+    except AccessDenied:
+        # A rejected write means the cached "can edit" answer is out of date
+        invalidate_permissions(syn_client, entity_id)
+        return False, f"🔒 You do not have permission to edit **{entity_id}**."
+    except Throttled:
+        return (
+            False,
+            "⏳ Synapse is limiting requests right now, so the annotation was not "
+            "saved. Please try again in a moment.",
+        )
     except Exception as e:
         return False, f"Failed to update annotation: {e}"
+
+
+def _update_entity(syn_client, entity_id, changes):
+    """Apply `changes` to one entity, returning the error if it failed."""
+    try:
+        update_annotations(syn_client, entity_id, changes)
+    except Exception as e:
+        return e
+    return None
+
+
+def bulk_update_annotations(
+    syn_client,
+    entity_ids,
+    changes,
+    max_workers=MAX_WORKERS,
+    on_progress=None,
+):
+    """
+    Apply the same annotation changes to many entities concurrently.
+
+    Each entity gets one write. Transient failures are already retried by the
+    request scheduler and edit conflicts by `update_annotations`, so neither
+    is retried again here.
+
+    Args:
+        changes (dict): Annotation keys mapped to values, as for `update_annotations`.
+        on_progress (callable): Called from the calling thread as
+            `on_progress(done, total, result)` each time an entity finishes.
+
+    Returns:
+        list[dict]: One entry per entity, in the order of `entity_ids`, with
+        keys `id`, `success` and `error` (None on success).
+    """
+    entity_ids = list(dict.fromkeys(entity_ids))
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_update_entity, syn_client, entity_id, changes): entity_id
+            for entity_id in entity_ids
+        }
+        for future in as_completed(futures):
+            entity_id = futures[future]
+            error = future.result()
+            if error is not None and _status_code(error) in (401, 403):
+                invalidate_permissions(syn_client, entity_id)
+            result = {
+                "id": entity_id,
+                "success": error is None,
+                "error": None if error is None else str(error) or type(error).__name__,
+            }
+            results[entity_id] = result
+            if on_progress is not None:
+                on_progress(len(results), len(entity_ids), result)
+
+    return [results[entity_id] for entity_id in entity_ids]
+
+
+# Time the loaders and writers above, including the calls they make to one
+# another. Helpers such as _user_key or get_disk_cache run too often, and too
+# quickly, for their timings to be worth taking the metrics lock.
+instrument_module(
+    sys.modules[__name__],
+    "service",
+    include=(
+        "fetch_",
+        "load_",
+        "build_",
+        "refresh_",
+        "summarize_",
+        "update_",
+        "bulk_update_",
+        "can_edit_",
+        "get_annotation",
+        "search_",
+        "sort_",
+    ),
+)
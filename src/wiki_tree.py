@@ -0,0 +1,75 @@
+"""Wiki page hierarchy for Synapse Wiki Annotator."""
+
+from src.search import normalize
+
+
+class WikiTree:
+    """
+    The parent/child structure of a project's wiki, built from its flat header list.
+
+    Pages are addressed by wiki ID, so pages that share a title stay distinct.
+    Children keep the order in which Synapse returned them.
+    """
+
+    def __init__(self, headers):
+        self.headers = headers
+        self.titles = {}
+        self.parents = {}
+        self.children = {}
+        self.roots = []
+        for header in headers:
+            wiki_id = header["id"]
+            self.titles[wiki_id] = header.get("title") or "(untitled)"
+            self.parents[wiki_id] = header.get("parentId")
+            self.children.setdefault(wiki_id, [])
+        for wiki_id, parent_id in self.parents.items():
+            if parent_id in self.children:
+                self.children[parent_id].append(wiki_id)
+            else:
+                self.roots.append(wiki_id)
+        self._search_titles = {
+            wiki_id: normalize(title) for wiki_id, title in self.titles.items()
+        }
+        self._order = [wiki_id for wiki_id, _ in self.visible(self.titles)]
+
+    def __len__(self):
+        return len(self.titles)
+
+    def __contains__(self, wiki_id):
+        return wiki_id in self.titles
+
+    def path(self, wiki_id):
+        """Return the IDs from the root down to `wiki_id`."""
+        path = []
+        seen = set()
+        while wiki_id in self.titles and wiki_id not in seen:
+            seen.add(wiki_id)
+            path.append(wiki_id)
+            wiki_id = self.parents[wiki_id]
+        return path[::-1]
+
+    def visible(self, expanded):
+        """
+        List the pages to render when only the `expanded` pages show their children.
+
+        Returns:
+            list[tuple[str, int]]: (wiki ID, depth) pairs in display order.
+        """
+        rows = []
+        stack = [(wiki_id, 0) for wiki_id in reversed(self.roots)]
+        while stack:
+            wiki_id, depth = stack.pop()
+            rows.append((wiki_id, depth))
+            if wiki_id in expanded:
+                stack.extend(
+                    (child_id, depth + 1)
+                    for child_id in reversed(self.children[wiki_id])
+                )
+        return rows
+
+    def filter(self, query):
+        """Return the IDs of pages whose title contains `query`, in tree order."""
+        needle = normalize(query)
+        return [
+            wiki_id for wiki_id in self._order if needle in self._search_titles[wiki_id]
+        ]
@@ -0,0 +1,31 @@
+import logging
+import os
+import tempfile
+
+# Keep the service's persistent cache away from the app's own .cache/
+os.environ.setdefault("CHALLENGE_DASHBOARD_CACHE_DIR", tempfile.mkdtemp())
+
+# The service runs outside `streamlit run` here; silence the bare-mode warnings
+logging.disable(logging.WARNING)
+
+import pytest
+
+from benchmarks.fake_synapse import FakeSynapse
+from benchmarks.run import reset_caches
+from src.metrics import InstrumentedClient
+from src.scheduler import RequestScheduler, ScheduledClient
+
+
+@pytest.fixture
+def fake():
+    """A fake deployment of 30 projects, with every service cache emptied."""
+    reset_caches()
+    return FakeSynapse(30, seed=1)
+
+
+@pytest.fixture
+def syn(fake):
+    """`fake` behind the app's client wrappers, failing without retries."""
+    return ScheduledClient(
+        InstrumentedClient(fake), RequestScheduler(rate=None, max_retries=0)
+    )
@@ -0,0 +1,45 @@
+import datetime
+
+from src import synapse_service as service
+
+
+def _editable_annotated(fake):
+    return next(
+        project_id
+        for project_id, project in fake.projects.items()
+        if project["can_edit"] and project["annotations"]
+    )
+
+
+def test_update_keeps_lists_and_types(fake):
+    project_id = _editable_annotated(fake)
+    status = fake.projects[project_id]["annotations"]["status"]
+
+    service.update_annotations(
+        fake,
+        project_id,
+        {
+            "challengeType": ["Data To Model", "Model to Data"],
+            "participants": 12,
+            "closesOn": datetime.date(2026, 1, 2),
+        },
+    )
+
+    stored = fake.projects[project_id]["annotations"]
+    assert stored["challengeType"] == {
+        "type": "STRING",
+        "value": ["Data To Model", "Model to Data"],
+    }
+    assert stored["participants"] == {"type": "LONG", "value": ["12"]}
+    assert stored["status"] == status
+    annotations = service.get_annotations(fake, project_id)
+    assert annotations["participants"] == [12]
+    assert annotations["closesOn"] == [
+        datetime.datetime(2026, 1, 2, tzinfo=datetime.timezone.utc)
+    ]
+
+
+def test_empty_value_removes_the_key(fake):
+    project_id = _editable_annotated(fake)
+    service.update_annotations(fake, project_id, {"challengeType": ""})
+    assert "challengeType" not in fake.projects[project_id]["annotations"]
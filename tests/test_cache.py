@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.cache import DiskCache
+
+
+def test_disk_cache_round_trip(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=2**20)
+    cache.set("a", {"value": 1}, ttl=60)
+    assert cache.get("a") == {"value": 1}
+    assert DiskCache(tmp_path, max_bytes=2**20).get("a") == {"value": 1}
+
+    cache.set("expired", 1, ttl=-1)
+    assert cache.get("expired") is None
+
+    cache.delete("a")
+    assert cache.get("a") is None
+
+
+def test_disk_cache_evicts_least_recently_read(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=3000)
+    for key in ("a", "b", "c"):
+        cache.set(key, b"x" * 900, ttl=60)
+        time.sleep(0.01)
+    cache.get("a")
+    cache.set("d", b"x" * 900, ttl=60)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in ("a", "c", "d"))
+    assert cache._bytes == cache._total(cache._conn) <= 3000
+
+
+def test_disk_cache_batch_commits_on_exit(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=2**20)
+    other = DiskCache(tmp_path, max_bytes=2**20)
+    with cache.batch():
+        cache.set("a", 1, ttl=60)
+        assert cache.get("a") == 1
+        assert other.get("a") is None
+    assert other.get("a") == 1
+
+
+def test_disk_cache_batch_holds_only_its_own_writes(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=2**20)
+    other = DiskCache(tmp_path, max_bytes=2**20)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with cache.batch() as batch:
+            # Work run through the batch is held with the batch's own writes
+            executor.submit(batch.run, cache.set, "held", 1, 60).result()
+            # Other threads, such as other sessions, are not held back
+            executor.submit(cache.set, "direct", 2, 60).result()
+            assert other.get("held") is None
+            assert other.get("direct") == 2
+        assert other.get("held") == 1
+
+
+def test_disk_cache_delete_prefix(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=2**20)
+    with cache.batch():
+        cache.set("permissions:1", 1, ttl=60)
+        cache.set("permissions:2", 2, ttl=60)
+        cache.set("annotations:1", 3, ttl=60)
+        cache.delete_prefix("permissions:")
+    assert cache.get("permissions:1") is None
+    assert cache.get("permissions:2") is None
+    assert cache.get("annotations:1") == 3
+    assert cache._bytes == cache._total(cache._conn)
@@ -0,0 +1,39 @@
+from unittest import mock
+
+import pandas as pd
+
+from src import export, synapse_service as service
+
+
+def test_fresh_export_leaves_the_shared_cache_alone(fake, tmp_path, monkeypatch):
+    monkeypatch.setenv("SYNAPSE_AUTH_TOKEN", "export-test")
+    monkeypatch.setattr(service, "CACHE_DIR", service.CACHE_DIR)
+    service.get_synapse_client.clear()
+    shared = service.get_disk_cache()
+    shared.set("snapshot:someone:syn1", {"projects": []}, ttl=60)
+    output = tmp_path / "projects.csv"
+
+    try:
+        with mock.patch("synapseclient.Synapse", lambda: fake):
+            export.main([str(output), "--fresh"])
+    finally:
+        service.get_disk_cache.clear()
+        service.get_synapse_client.clear()
+
+    assert len(pd.read_csv(output)) == len(fake.projects)
+    assert shared.get("snapshot:someone:syn1") == {"projects": []}
+    assert shared.get(f"project_list:{service.TABLE_ID}:True") is None
+
+
+def test_round_trip_without_annotation_keys():
+    snapshot = service.snapshot_frame(
+        [
+            {"Project ID": "syn1", "Project Name": "One"},
+            {"Project ID": "syn2", "Project Name": "Two"},
+        ]
+    )
+
+    restored = export.snapshot_from_export(export.export_frame(snapshot, []), [])
+
+    assert list(restored.index) == ["syn1", "syn2"]
+    assert list(restored["Annotations"]) == [{}, {}]
@@ -0,0 +1,33 @@
+import sys
+import threading
+
+from src.lazy import lazy_import
+
+
+def test_first_use_from_many_threads(tmp_path, monkeypatch):
+    (tmp_path / "slow_module.py").write_text(
+        "import time\ntime.sleep(0.2)\nVALUE = 1\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "slow_module", raising=False)
+    module = lazy_import("slow_module")
+    assert "slow_module" not in sys.modules
+
+    barrier = threading.Barrier(8)
+    values, errors = [], []
+
+    def read():
+        barrier.wait()
+        try:
+            values.append(module.VALUE)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert values == [1] * 8
@@ -0,0 +1,22 @@
+from synapseclient.core.credentials.cred_data import SynapseAuthTokenCredentials
+
+from benchmarks.fake_synapse import FakeSynapse
+from src import synapse_service as service
+from src.metrics import InstrumentedClient, metrics
+
+
+def test_instrumented_client_passes_credentials_through():
+    fake = FakeSynapse(1)
+    fake.credentials = SynapseAuthTokenCredentials("token", username="curator")
+    fake.credentials.owner_id = "3300001"
+    client = InstrumentedClient(fake)
+
+    # Credentials are callable (requests auth), but must not be wrapped
+    assert client.credentials is fake.credentials
+    assert service._user_key(client) == "3300001"
+
+
+def test_instrumented_client_times_methods():
+    metrics.reset()
+    InstrumentedClient(FakeSynapse(1)).getUserProfile()
+    assert metrics.snapshot()["operations"]["syn.getUserProfile"]["calls"] == 1
@@ -0,0 +1,100 @@
+from unittest import mock
+
+import pytest
+import requests
+import synapseclient
+from synapseclient.core.credentials.cred_data import SynapseAuthTokenCredentials
+
+from benchmarks.fake_synapse import FakeSynapse, _http_error
+from benchmarks.run import reset_caches
+from src import synapse_service as service
+from src.metrics import InstrumentedClient
+from src.scheduler import (
+    RequestScheduler,
+    ScheduledClient,
+    Throttled,
+    disable_client_retries,
+)
+
+
+def _response(status_code, uri):
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = uri
+    response._content = b'{"reason": "Too many requests"}'
+    return response
+
+
+def test_scheduler_is_the_only_retry_layer():
+    syn = synapseclient.Synapse(skip_checks=True, silent=True)
+    disable_client_retries(syn)
+    sent = []
+
+    def get(uri, **kwargs):
+        sent.append(uri)
+        return _response(429, uri)
+
+    syn._requests_session = mock.Mock(get=get)
+    client = ScheduledClient(
+        InstrumentedClient(syn),
+        RequestScheduler(rate=None, max_retries=2, backoff_base=0.001),
+    )
+    with pytest.raises(Throttled):
+        client.restGET("/entity/syn1/permissions")
+    # One request per attempt: the first and two retries
+    assert len(sent) == 3
+
+
+def test_scheduled_client_passes_credentials_through():
+    syn = synapseclient.Synapse(skip_checks=True, silent=True)
+    syn.credentials = SynapseAuthTokenCredentials("token", username="curator")
+    syn.credentials.owner_id = "3300001"
+    client = ScheduledClient(InstrumentedClient(syn))
+
+    assert client.credentials is syn.credentials
+    assert service._user_key(client) == "3300001"
+
+
+def test_scheduled_client_reads_generators_within_the_call():
+    scheduled = []
+
+    class Scheduler(RequestScheduler):
+        def call(self, func, *args, **kwargs):
+            scheduled.append(True)
+            try:
+                return super().call(func, *args, **kwargs)
+            finally:
+                scheduled.pop()
+
+    class Client:
+        def getTableColumns(self, table_id):
+            for name in ("a", "b"):
+                # Each page is requested while iterating
+                assert scheduled, "page requested outside the scheduler"
+                yield name
+
+    client = ScheduledClient(InstrumentedClient(Client()), Scheduler(rate=None))
+    assert client.getTableColumns("syn1") == ["a", "b"]
+
+
+def test_bulk_update_leaves_retries_to_the_scheduler(monkeypatch):
+    reset_caches()
+    fake = FakeSynapse(5, seed=4, editable_share=1.0)
+    puts = []
+
+    def unavailable(self, uri, body=None, **kwargs):
+        puts.append(uri)
+        raise _http_error(503, "Service Unavailable")
+
+    monkeypatch.setattr(FakeSynapse, "restPUT", unavailable)
+    client = ScheduledClient(
+        InstrumentedClient(fake),
+        RequestScheduler(rate=None, max_retries=1, backoff_base=0.001),
+    )
+    results = service.bulk_update_annotations(
+        client, list(fake.projects), {"status": "Closed"}
+    )
+
+    assert not any(result["success"] for result in results)
+    # The first attempt and the scheduler's one retry, per project
+    assert len(puts) == 2 * len(fake.projects)
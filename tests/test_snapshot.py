@@ -0,0 +1,74 @@
+import pytest
+
+from benchmarks.fake_synapse import FakeSynapse, _http_error
+from src import synapse_service as service
+from src.scheduler import Throttled
+from src.search import ProjectSearchIndex
+
+
+def _multi_valued(fake):
+    return [
+        project_id
+        for project_id, project in fake.projects.items()
+        if len(project["annotations"].get("challengeType", {}).get("value", [])) > 1
+    ]
+
+
+def test_view_and_entity_values_share_one_format(fake, syn):
+    snapshot = service.build_project_snapshot(syn)
+    refetched, from_view = _multi_valued(fake)[:2]
+    fake.touch(refetched)
+    snapshot = service.refresh_project_snapshot(syn, snapshot)
+
+    for project_id in (refetched, from_view):
+        expected = ", ".join(
+            fake.projects[project_id]["annotations"]["challengeType"]["value"]
+        )
+        value = snapshot.loc[project_id, "Annotations"]["challengeType"]
+        assert value == expected
+
+
+def test_join_values():
+    assert service.join_values('["Data To Model", "Model to Data"]') == (
+        "Data To Model, Model to Data"
+    )
+    assert service.join_values(["Model to Data"]) == "Model to Data"
+    assert service.join_values("Active") == "Active"
+    assert service.join_values("[not json") == "[not json"
+
+
+def test_search_keeps_the_index_ranking():
+    projects = service.snapshot_frame(
+        [
+            {"Project ID": "syn1", "Project Name": "Tumors Challenge"},
+            {"Project ID": "syn2", "Project Name": "Sepsis Challenge"},
+            {"Project ID": "syn3", "Project Name": "Tumor Challenge"},
+        ]
+    )
+    index = ProjectSearchIndex(projects)
+
+    result = service.search_projects(projects, index, "tumor")
+    # The exact match ranks above the prefix match that comes first in the table
+    assert list(result.index) == index.search("tumor") == ["syn3", "syn1"]
+
+
+def test_build_without_annotation_columns(fake, syn):
+    fake.getTableColumns = lambda table_id: []
+
+    snapshot = service.build_project_snapshot(syn)
+
+    assert list(snapshot.index) == list(fake.projects)
+    assert snapshot["Error"].isna().all()
+    assert not snapshot["Has Annotations"].any()
+
+
+def test_throttled_schema_is_raised_and_not_cached(syn, monkeypatch):
+    def throttled(self, table_id):
+        raise _http_error(429, "Too Many Requests")
+
+    monkeypatch.setattr(FakeSynapse, "getTableColumns", throttled)
+    with pytest.raises(Throttled):
+        service.fetch_view_schema(syn)
+
+    monkeypatch.undo()
+    assert "challengeType" in service.fetch_view_schema(syn)
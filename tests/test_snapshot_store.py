@@ -0,0 +1,55 @@
+from src import synapse_service as service
+
+
+def test_store_refreshes_incrementally(fake, syn):
+    store = service.ProjectSnapshotStore(max_age=0)
+    first = store.get(syn)
+    assert len(first) == 30
+    assert store.error is None
+
+    changed = list(fake.projects)[:3]
+    for project_id in changed:
+        fake.touch(project_id)
+    del fake.projects[list(fake.projects)[-1]]
+    updated_at = store.updated_at
+
+    assert store.refresh(syn)
+    store._thread.join()
+
+    assert store.error is None
+    assert store.updated_at > updated_at
+    assert len(store.snapshot) == 29
+    for project_id in changed:
+        assert (
+            store.snapshot.loc[project_id, "Etag"] == fake.projects[project_id]["etag"]
+        )
+    # Untouched rows are carried over from the previous snapshot
+    unchanged = list(fake.projects)[5]
+    assert store.snapshot.loc[unchanged, "Etag"] == first.loc[unchanged, "Etag"]
+
+
+def test_stale_store_refreshes_in_background(fake, syn):
+    store = service.ProjectSnapshotStore(max_age=0)
+    store.get(syn)
+    fake.touch(list(fake.projects)[0])
+
+    store.get(syn)
+    store._thread.join()
+
+    assert store.error is None
+    project_id = list(fake.projects)[0]
+    assert store.snapshot.loc[project_id, "Etag"] == fake.projects[project_id]["etag"]
+
+
+def test_failed_refresh_is_not_retried_on_every_get(fake, syn):
+    store = service.ProjectSnapshotStore(max_age=0)
+    store.get(syn)
+    fake.error_rate = 1.0
+
+    store.get(syn)
+    store._thread.join()
+    assert store.error is not None
+    failed_thread = store._thread
+
+    store.get(syn)
+    assert store._thread is failed_thread